@@ -21,6 +21,8 @@ using System.Text.RegularExpressions;
 using System.Threading.Tasks;
 using RabbitMQ.Client;
 using System.Net.Sockets;
+using System.Buffers.Binary;
+using System.IO.Compression;
 
 namespace DiscordBot
 {
@@ -29,8 +31,18 @@ namespace DiscordBot
         
         private readonly ILogger<DiscordBot> _logger;
         private readonly string hostName = "localhost";
+        private readonly int port = 5000;
         private IEventManager _eventManager;
 
+        // every message is one frame on a connection kept open between events:
+        // a flags byte, the payload length as a big endian uint32, then the json payload (zlib compressed when FlagZlib is set)
+        private const byte FlagZlib = 1;
+        private const int CompressAbove = 1024;
+        private readonly bool compressMessages = true;
+        private readonly object sendLock = new object();
+        private TcpClient? client;
+        private NetworkStream? stream;
+
         public DiscordBotListener(ILogger<DiscordBot> logger, IEventManager eventManager)
         {   
             _logger = logger;
@@ -119,32 +131,83 @@ namespace DiscordBot
             _logger.LogInformation(jsonData);
             SendMessage(jsonData);
         }
+        private byte[] EncodeFrame(string message)
+        {
+            byte[] payload = Encoding.UTF8.GetBytes(message);
+            byte flags = 0;
+            if (compressMessages && payload.Length > CompressAbove)
+            {
+                using (var output = new MemoryStream())
+                {
+                    using (var zlib = new ZLibStream(output, CompressionLevel.Fastest))
+                    {
+                        zlib.Write(payload, 0, payload.Length);
+                    }
+                    payload = output.ToArray();
+                }
+                flags |= FlagZlib;
+            }
+
+            byte[] frame = new byte[5 + payload.Length];
+            frame[0] = flags;
+            BinaryPrimitives.WriteUInt32BigEndian(frame.AsSpan(1, 4), (uint)payload.Length);
+            payload.CopyTo(frame, 5);
+            return frame;
+        }
+
+        private void CloseConnection()
+        {
+            stream?.Dispose();
+            client?.Dispose();
+            stream = null;
+            client = null;
+        }
+
+        private bool PeerClosed()
+        {
+            // the bot never writes back, so a readable socket with nothing to read is a connection it closed.
+            // A write to it still succeeds locally and Connected stays true, the frame would just be lost
+            try
+            {
+                return client.Client.Poll(0, SelectMode.SelectRead) && client.Client.Available == 0;
+            }
+            catch (Exception)
+            {
+                return true;
+            }
+        }
+
         private void SendMessage(string message)
         {
             _logger.LogDebug(message);
-                
-            try
+            byte[] frame = EncodeFrame(message);
+
+            lock (sendLock)
             {
-                // Connect to the server
-                using (var client = new TcpClient(hostName, 5000))
+                // a connection the bot closed is reopened before the write, a send that still fails reconnects and tries once more
+                for (int attempt = 1; attempt <= 2; attempt++)
                 {
-                    // Get the network stream
-                    using (var stream = client.GetStream())
+                    try
                     {
-                        // Convert the message to bytes
-                        byte[] data = Encoding.UTF8.GetBytes(message);
-
-                        // Send the message
-                        stream.Write(data, 0, data.Length);
+                        if (client == null || stream == null || !client.Connected || PeerClosed())
+                        {
+                            CloseConnection();
+                            client = new TcpClient(hostName, port);
+                            client.NoDelay = true;
+                            stream = client.GetStream();
+                        }
+                        stream.Write(frame, 0, frame.Length);
 
                         _logger.LogInformation($"Message sent: {message}");
+                        return;
+                    }
+                    catch (Exception ex)
+                    {
+                        CloseConnection();
+                        _logger.LogError($"An error occurred while sending message (attempt {attempt}): {ex.Message}");
                     }
                 }
             }
-            catch (Exception ex)
-            {
-                _logger.LogError($"An error occurred while sending message: {ex.Message}");
-            }
         }
     }
 }
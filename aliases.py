@@ -0,0 +1,51 @@
+import os
+import json
+from leaderboard import normalize_name
+
+class PlayerAliases:
+    def __init__(self, alias_file):
+        # append-only rename journal: names a player used in older logs -> their player id -> current name
+        # a rename only covers matches started before it, so a later player picking up the old name stays separate
+        self.alias_file = alias_file
+        self.renames = {} # normalized old name -> [(player id, renamed at)] in rename order
+        self.names = {} # player id -> current name
+        self.load()
+
+
+    def load(self):
+        try:
+            with open(self.alias_file, 'r') as file:
+                lines = file.read().split('\n')
+        except FileNotFoundError:
+            return
+        for line in lines[:-1]: # the last piece is empty, or an append cut off by a crash
+            if line:
+                self.apply(json.loads(line))
+
+
+    def apply(self, entry):
+        self.renames.setdefault(normalize_name(entry['old']), []).append((entry['id'], entry['at']))
+        self.names[entry['id']] = entry['new']
+
+
+    def rename(self, player_id, old_name, new_name, renamed_at):
+        entry = {'id': int(player_id), 'old': old_name, 'new': new_name, 'at': renamed_at}
+        with open(self.alias_file, 'a') as file:
+            file.write(json.dumps(entry) + '\n')
+        self.apply(entry)
+
+
+    def resolve(self, name, started=None):
+        if not self.renames or name is None:
+            return name
+        for player_id, renamed_at in self.renames.get(normalize_name(name[:-2] if name.endswith(" |") else name), ()):
+            if started is None or started < renamed_at:
+                return self.names[player_id]
+        return name
+
+
+    def clear(self):
+        self.renames = {}
+        self.names = {}
+        if os.path.exists(self.alias_file):
+            os.remove(self.alias_file)
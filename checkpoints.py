@@ -0,0 +1,138 @@
+import os
+import json
+import pickle
+from bisect import bisect_left, bisect_right, insort
+
+class CheckpointStore:
+    def __init__(self, directory, interval=250):
+        # leaderboard snapshots taken every `interval` matches, keyed by [gameStarted, match file] of the latest started match in them.
+        # A snapshot has to hold every match started up to its key and nothing after, a match committed late drops the ones
+        # taken without it and match_count lets a replay check the rest against the season
+        self.directory = directory
+        self.interval = interval
+        self.index_file = os.path.join(directory, 'index.json')
+        self.keys = []
+        self.since_last = 0
+        self.last_key = None # key of the latest started match committed
+        self.match_count = 0 # matches the leaderboard holds, set by restart()
+        self.pending = None # checkpoints held back while a replay runs, written by commit()
+        self.deferred_state = None # restored by cancel()
+        os.makedirs(self.directory, exist_ok=True)
+        self.load()
+
+
+    def load(self):
+        try:
+            with open(self.index_file, 'r') as file:
+                self.keys = sorted(json.load(file))
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.keys = []
+
+
+    def save_index(self):
+        temp_file = f"{self.index_file}.tmp"
+        with open(temp_file, 'w') as file:
+            json.dump(self.keys, file)
+        os.replace(temp_file, self.index_file)
+
+
+    def checkpoint_file(self, key):
+        return os.path.join(self.directory, f"{key[1]}.pkl")
+
+
+    def restart(self, key=None, match_count=0):
+        # counting goes on from a leaderboard holding match_count matches up to key, i.e. a new season,
+        # a replay from the snapshot at key or the saved leaderboard when the bot starts
+        self.last_key = None if key is None else list(key)
+        self.match_count = match_count
+        self.since_last = 0
+
+
+    def match_committed(self, key, leaderboard):
+        key = list(key)
+        self.match_count += 1
+        self.since_last += 1
+        if self.last_key is not None and key < self.last_key:
+            # started before matches that are already counted, the snapshots after it are missing it
+            self.discard_from(key)
+        else:
+            self.last_key = key
+        if self.since_last >= self.interval:
+            self.save(self.last_key, leaderboard)
+
+
+    def save(self, key, leaderboard):
+        self.since_last = 0
+        leaderboard.flush() # the history lengths below have to be on disk
+        checkpoint = {'key': list(key),
+                      'match_count': self.match_count,
+                      'leaderboard': leaderboard.leaderboard.copy(),
+                      'history_lengths': {int(player_id): leaderboard.history.length(player_id) for player_id in leaderboard.leaderboard.index}}
+        if self.pending is not None:
+            self.pending.append(checkpoint)
+        else:
+            self.write(checkpoint)
+
+
+    def write(self, checkpoint):
+        temp_file = f"{self.checkpoint_file(checkpoint['key'])}.tmp"
+        with open(temp_file, 'wb') as file:
+            pickle.dump(checkpoint, file, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_file, self.checkpoint_file(checkpoint['key']))
+        if checkpoint['key'] not in self.keys:
+            insort(self.keys, checkpoint['key'])
+        self.save_index()
+
+
+    def latest_before(self, key):
+        position = bisect_left(self.keys, list(key))
+        while position > 0:
+            position -= 1
+            try:
+                with open(self.checkpoint_file(self.keys[position]), 'rb') as file:
+                    return pickle.load(file)
+            except (FileNotFoundError, pickle.UnpicklingError, EOFError):
+                continue
+        return None
+
+
+    def discard_from(self, key):
+        # checkpoints at or after a changed match no longer describe the season
+        position = bisect_left(self.keys, list(key))
+        for stale_key in self.keys[position:]:
+            try:
+                os.remove(self.checkpoint_file(stale_key))
+            except FileNotFoundError:
+                pass
+        del self.keys[position:]
+        self.save_index()
+
+
+    def clear(self):
+        if self.keys:
+            self.discard_from(self.keys[0])
+
+
+    def is_complete(self, checkpoint, sorted_keys):
+        # False when a match started before the snapshot was added after it was taken
+        return checkpoint.get('match_count') == bisect_right(sorted_keys, checkpoint['key'])
+
+
+    def defer(self, checkpoint=None):
+        self.deferred_state = (self.last_key, self.match_count, self.since_last)
+        self.pending = []
+        if checkpoint is None:
+            self.restart()
+        else:
+            self.restart(checkpoint['key'], checkpoint['match_count'])
+
+
+    def commit(self):
+        pending, self.pending = self.pending or [], None
+        for checkpoint in pending:
+            self.write(checkpoint)
+
+
+    def cancel(self):
+        self.pending = None
+        self.last_key, self.match_count, self.since_last = self.deferred_state
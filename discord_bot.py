@@ -3,6 +3,7 @@ import difflib
 import json
 import logging
 import io
+import zlib
 from datetime import datetime
 from typing import Union, Optional
 
@@ -13,11 +14,15 @@ from discord import app_commands, Button, ButtonStyle
 
 from file_processing import FileHandler
 from match_class import Match
+from match_decoder import EventType
+from event_engine import EventEngine
+from plugin_protocol import read_frames, decode_payload
+from game_dispatcher import GameEventDispatcher
+from work_executor import WorkExecutor
+from mmr_graph import MMRGraphRenderer
 
 from rapidfuzz import fuzz, process
 import pandas as pd
-import matplotlib.pyplot as plt
-import os
 
 
 default_color_emojis = {
@@ -111,6 +116,10 @@ class DiscordBot(commands.Bot):
         self.cancels_channel = variables['cancels_channel']
         self.admin_logs_channel = variables['admin_logs_channel']
         self.season_name = variables['season_name']
+        self.write_behind = variables.get('write_behind', True)
+        self.flush_interval = variables.get('flush_interval', 30)
+        self.parse_workers = variables.get('parse_workers', None) # None parses unprocessed matches on every core
+        self.max_pending_events = variables.get('max_pending_events', 32) # per game, before new events are dropped
         
 
         #init local variables
@@ -119,10 +128,17 @@ class DiscordBot(commands.Bot):
         self.auto_mute = True
         self.games_in_progress = []
         self.version = "v1.2"
+        self.lb_fields_cache = {} # rendered !lb fields, valid for one leaderboard version
+        self.lb_fields_version = None
 
         #init subclasses
-        self.file_handler = FileHandler(self.matches_path, self.database_location)
+        self.file_handler = FileHandler(self.matches_path, self.database_location, self.write_behind, self.flush_interval, self.parse_workers)
         self.leaderboard = self.file_handler.leaderboard
+        self.dispatcher = GameEventDispatcher(self.handle_event, self.max_pending_events)
+        self.render_workers = variables.get('render_workers', 2)
+        self.executor = WorkExecutor(self.render_workers) # file_handler and leaderboard writes go through executor.write, off the event loop
+        self.graphs = MMRGraphRenderer(variables.get('graph_cache_size', 256))
+        self.graph_points = variables.get('graph_points', 500) # per line, longer careers are downsampled to this
 
         #check for unprocessed matches
         self.logger.info(f"Loading all match files from{self.matches_path}")
@@ -222,6 +238,14 @@ class DiscordBot(commands.Bot):
             for stat_name, stat_value in player_stats.items():
                 embed.add_field(name=stat_name, value=stat_value, inline=True)
 
+            players_around = self.leaderboard.players_around(player_row)
+            if not players_around.empty:
+                around_lines = []
+                for rank, around_name, around_mmr in zip(players_around.index, players_around['Player Name'], players_around['MMR']):
+                    line = f"#{rank + 1} {around_name} - {round(around_mmr, 1)}"
+                    around_lines.append(f"**{line}**" if rank == player_row['Rank'] else line)
+                embed.add_field(name="Players Around", value="\n".join(around_lines), inline=False)
+
             player_mmr = self.leaderboard.get_player_mmr(player_row)
 
             if player_mmr < 900:
@@ -276,14 +300,7 @@ class DiscordBot(commands.Bot):
             embed = discord.Embed(title=title, color=color)
             embed.set_thumbnail(url=self.guild.icon.url)
 
-            chunks = [top_players[i:i + players_per_field] for i in range(0, len(top_players), players_per_field)]
-
-            for i, chunk in enumerate(chunks):
-                leaderboard_text = ""
-                for index, row in chunk.iterrows():
-                    rank = top_emojis[index] if index < len(top_emojis) else f"**{index + 1}.**"
-                    leaderboard_text += f"{rank} **{row['Player Name']}**\n"
-                    leaderboard_text += f"MMR: {row.iloc[1]}\n"
+            for leaderboard_text in self.leaderboard_fields(top_players, players_per_field):
                 embed.add_field(name=f"", value=leaderboard_text, inline=False)
 
             embed.set_footer(text=f"{self.season_name} Data - Bot Programmed by Aiden | Version: {self.version}", icon_url=self.user.avatar.url)
@@ -293,7 +310,8 @@ class DiscordBot(commands.Bot):
 
         @self.hybrid_command(name="graph_mmr", description = "Graph MMR change of yourself or a player")
         @app_commands.describe(player = "Player name or @Player")
-        async def graph_mmr(ctx:Context, player: Optional[str]):
+        @app_commands.describe(games = "Only the last number of games")
+        async def graph_mmr(ctx:Context, player: Optional[str], games: Optional[int] = None):
             if ctx.channel.id != self.bot_commands:
                 await ctx.send(f"Please use https://discord.com/channels/{self.guild_id}/{self.bot_commands}",delete_after=5)
                 await ctx.message.delete(delay=1)
@@ -337,34 +355,11 @@ class DiscordBot(commands.Bot):
                     if player_row is None:
                         await ctx.channel.send(f"Player {player_name} not found.")
                         return
-            mmr_changes = player_row['Change In MMR']
-            crew_changes = player_row['Change In Crewmate MMR']
-            imp_changes = player_row['Change In Impostor MMR']
-            impostor_mmr = 1000
-            crew_mmr = 1000
-            total_mmr = 1000
-            impostor_mmrs = [impostor_mmr]
-            crew_mmrs = [crew_mmr]
-            total_mmrs = [total_mmr]
-            for i in range(len(mmr_changes)):
-                impostor_mmr += imp_changes[i]
-                crew_mmr += crew_changes[i]
-                total_mmr += mmr_changes[i]
-                impostor_mmrs.append(impostor_mmr)
-                crew_mmrs.append(crew_mmr)
-                total_mmrs.append(total_mmr)
-            plt.plot(impostor_mmrs, color='red', label='Impostor MMR')
-            plt.plot(crew_mmrs, color='blue', label='Crew MMR')
-            plt.plot(total_mmrs, color='purple', label='Total MMR')
-            plt.xlabel(player_name)
-            plt.ylabel('MMR')
-            plt.title('MMR Changes Over Time')
-            plt.legend()
-            buf = io.BytesIO()
-            plt.savefig(buf, format='png')
-            buf.seek(0)
-            await ctx.send(file=discord.File(buf, filename='mmr_changes.png'))
-            plt.clf()
+            key = self.mmr_graph_key(player_row, player_name, games)
+            png = self.graphs.get(key)
+            if png is None:
+                png = await self.executor.render(self.mmr_graph, key, player_row, player_name, games)
+            await ctx.send(file=discord.File(io.BytesIO(png), filename='mmr_changes.png'))
 
 
         @self.hybrid_command(name="link", description="Link a player or yourself to the bot")
@@ -391,7 +386,7 @@ class DiscordBot(commands.Bot):
                 await ctx.send(f"Player {player} not found in the database.")
                 return
 
-            if self.leaderboard.add_player_discord(player, discord_id):
+            if await self.executor.write(self.leaderboard.add_player_discord, player, discord_id):
                 await ctx.send(f"Linked {player} to <@{discord_id}> in the leaderboard.")
             else:
                 await ctx.send("Failed to link the player. Please try again later.")
@@ -408,7 +403,7 @@ class DiscordBot(commands.Bot):
                 discord_id = int(player[2:-1])
                 player_row = self.leaderboard.get_player_by_discord(discord_id)
                 if player_row is not None:
-                    self.leaderboard.delete_player_discord(player_row['Player Name'])
+                    await self.executor.write(self.leaderboard.delete_player_discord, player_row['Player Name'])
                     await ctx.send(f"Unlinked {player_row['Player Name']} from <@{discord_id}>")
                 else:
                     await ctx.send(f"{player} is not linked to any account")
@@ -418,7 +413,7 @@ class DiscordBot(commands.Bot):
                 if player_row is not None:
                     discord_id = self.leaderboard.get_player_discord(player_row)
                     if discord_id is not None:
-                        self.leaderboard.delete_player_discord(player)
+                        await self.executor.write(self.leaderboard.delete_player_discord, player)
                         await ctx.send(f"Unlinked {player} from <@{discord_id}>")
                     else:
                         await ctx.send(f"Player {player} is not linked to any account")
@@ -442,20 +437,20 @@ class DiscordBot(commands.Bot):
                 await ctx.send("Please specify a valid result: 'cancel', 'crew', or 'imp'.")
                 return
 
-            match_info = self.file_handler.match_info_by_id(match_id)
+            match_info = await self.executor.write(self.file_handler.match_info_by_id, match_id)
             if match_info is None:
                 await ctx.send(f"Cannot find match with ID: {match_id}")
                 return
 
             result_text = ""
             if result.startswith("cancel"):
-                changed_match = self.file_handler.change_result_to_cancelled(match_id)
+                changed_match = await self.executor.write(self.file_handler.change_result_to_cancelled, match_id)
                 result_text = "Cancelled"
             elif result.startswith("crew"):
-                changed_match = self.file_handler.change_result_to_crew_win(match_id)
+                changed_match = await self.executor.write(self.file_handler.change_result_to_crew_win, match_id)
                 result_text = "Crewmates Win"
             elif result.startswith("imp"):
-                changed_match = self.file_handler.change_result_to_imp_win(match_id)
+                changed_match = await self.executor.write(self.file_handler.change_result_to_imp_win, match_id)
                 result_text = "Impostors Win"
 
             if changed_match:
@@ -555,10 +550,7 @@ class DiscordBot(commands.Bot):
         async def match_info(ctx:Context, match_id : int):
             if match_id == None: 
                 return
-            match_file = self.file_handler.find_matchfile_by_id(int(match_id))
-            match = self.file_handler.match_from_file(match_file)
-            if not (match.result == "Canceled" or match.result == "Unknown"):
-                self.file_handler.calculate_mmr_gain_loss(match)
+            match = await self.executor.write(self.match_with_mmr_changes, int(match_id))
             await ctx.send(f"`{match.match_details()}`")
             self.logger.info(f"{ctx.author.display_name} Recieved Match {int(match_id)} Info")
         
@@ -599,13 +591,13 @@ class DiscordBot(commands.Bot):
 
             mmr_change_text = ""
             if change_type and change_type.startswith("crew"):
-                self.file_handler.leaderboard.mmr_change_crew(player_row, mmr_change_value)
+                await self.executor.write(self.file_handler.leaderboard.mmr_change_crew, player_row, mmr_change_value)
                 mmr_change_text = "Crew "
             elif change_type and change_type.startswith("imp"):
-                self.file_handler.leaderboard.mmr_change_imp(player_row, mmr_change_value)
+                await self.executor.write(self.file_handler.leaderboard.mmr_change_imp, player_row, mmr_change_value)
                 mmr_change_text = "Impostor "
             else:
-                self.file_handler.leaderboard.mmr_change(player_row, mmr_change_value)
+                await self.executor.write(self.file_handler.leaderboard.mmr_change, player_row, mmr_change_value)
 
             if mmr_change_value > 0:
                 await ctx.send(f"Added {mmr_change_value} {mmr_change_text} MMR to Player {player}")
@@ -622,7 +614,7 @@ class DiscordBot(commands.Bot):
             embed.add_field(name="**lb** [none/number]", value="Display the leaderboard for top Players.", inline=False)
             embed.add_field(name="**lb imp** [none/number]", value="Display the leaderboard for top Impostors.", inline=False)
             embed.add_field(name="**lb crew** [none/number]", value="Display the leaderboardfor top Crewmates.", inline=False)
-            embed.add_field(name="**graph_mmr** [none/player/@mention]", value="Display MMR Graph of a player.", inline=False)
+            embed.add_field(name="**graph_mmr** [none/player/@mention] [none/games]", value="Display MMR Graph of a player, optionally of the last games only.", inline=False)
             embed.add_field(name="**match_info** [match_id]", value="Display match info from the given ID", inline=False)
             embed.add_field(name="**rules**", value="Explains how the bot calculates MMR", inline=False)
             embed.add_field(name="**mmr_change** [player/@mention] [value] [Crew/Imp/None]", value="add or subtract mmr from the player", inline=False)
@@ -645,7 +637,7 @@ class DiscordBot(commands.Bot):
             if not any(role.id == self.staff_role for role in ctx.author.roles):
                 await ctx.send("You don't have permission to change a player's name.")
                 return
-            self.file_handler.change_player_name(old_name, new_name)
+            await self.executor.write(self.file_handler.change_player_name, old_name, new_name)
             await ctx.send(f'Changed player name from "{old_name}" to "{new_name}"')
             await self.get_channel(self.admin_logs_channel).send(f'Changed player name from "{old_name}" to "{new_name}"')
 
@@ -716,6 +708,12 @@ class DiscordBot(commands.Bot):
 
 
     async def update_leaderboard_discords(self):
+        # works on a snapshot of the guild's members, the fuzzy matching and the writes run on the writer thread
+        await self.executor.write(self.match_leaderboard_discords, list(self.guild.members), self.guild.name)
+
+
+    def match_leaderboard_discords(self, members, guild_name):
+        members_by_id = {member.id: member for member in members}
         players_to_remove = []
         for index, player_row in self.leaderboard.leaderboard.iterrows():
             player_name = player_row['Player Name']
@@ -723,7 +721,7 @@ class DiscordBot(commands.Bot):
             if pd.notnull(discord_id):
                 try:
                     discord_id = int(discord_id)
-                    member = self.guild.get_member(discord_id)
+                    member = members_by_id.get(discord_id)
                     if member is None and discord_id !=0:
                         players_to_remove.append(player_name)
                 except Exception as e:
@@ -739,7 +737,7 @@ class DiscordBot(commands.Bot):
         else:
             self.logger.info("All Discord IDs in the leaderboard are valid.")
 
-        for member in self.guild.members:
+        for member in members:
             player_name = member.display_name
             player_row = self.leaderboard.get_player_row(player_name)
             if player_row is not None:  # Check if Discord ID is empty
@@ -753,7 +751,7 @@ class DiscordBot(commands.Bot):
             player_name = player_row['Player Name']
             best_match = None
             best_score = 0
-            for member in self.guild.members:
+            for member in members:
                 member_display_name = member.display_name.lower().replace(" ","")
                 player_name_normalized = player_name.lower().replace(" ","")
                 match_score = fuzz.token_sort_ratio(player_name_normalized, member_display_name)
@@ -765,10 +763,31 @@ class DiscordBot(commands.Bot):
                 self.leaderboard.add_player_discord(player_name, discord_id)
                 self.logger.info(f"Added {best_match.display_name} to {player_name} in leaderboard (#2)")
             else:
-                self.logger.warning(f"Can't find a discord match for player {player_name} in {self.guild.name}")
+                self.logger.warning(f"Can't find a discord match for player {player_name} in {guild_name}")
         self.leaderboard.save_leaderboard()
 
 
+    def leaderboard_fields(self, top_players, players_per_field=20):
+        if self.lb_fields_version != self.leaderboard.version:
+            self.lb_fields_cache = {}
+            self.lb_fields_version = self.leaderboard.version
+        key = (top_players.columns[1], len(top_players), players_per_field)
+        fields = self.lb_fields_cache.get(key)
+        if fields is None:
+            fields = []
+            player_names = top_players['Player Name'].tolist()
+            player_mmrs = top_players.iloc[:, 1].tolist()
+            for start in range(0, len(player_names), players_per_field):
+                leaderboard_text = ""
+                for index in range(start, min(start + players_per_field, len(player_names))):
+                    rank = top_emojis[index] if index < len(top_emojis) else f"**{index + 1}.**"
+                    leaderboard_text += f"{rank} **{player_names[index]}**\n"
+                    leaderboard_text += f"MMR: {player_mmrs[index]}\n"
+                fields.append(leaderboard_text)
+            self.lb_fields_cache[key] = fields
+        return fields
+
+
     def start_game_embed(self, json_data) -> discord.Embed:
         players = json_data.get("Players", [])
         player_colors = json_data.get("PlayerColors", [])
@@ -870,113 +889,38 @@ class DiscordBot(commands.Bot):
         return embed  
 
 
+    def match_with_mmr_changes(self, match_id):
+        match_file = self.file_handler.find_matchfile_by_id(match_id)
+        match = self.file_handler.match_from_file(match_file)
+        if not (match.result == "Canceled" or match.result == "Unknown"):
+            self.file_handler.calculate_mmr_gain_loss(match)
+        return match
+
+
+    def mmr_graph_key(self, player_row, player_name, games=None):
+        # a graph only changes when the player plays, is renamed, or the history is rewritten by a replay
+        return (int(player_row['Player ID']), player_name, self.leaderboard.get_mmr_history_length(player_row),
+                self.season_name, self.leaderboard.history_generation, games, self.graph_points)
+
+
+    def mmr_graph(self, key, player_row, player_name, games=None):
+        length = key[2] # games played when the key was made, later games belong to the next key
+        first_game = max(length - games, 0) if games and games > 0 else None
+        series = self.leaderboard.get_mmr_series(player_row, self.graph_points, first_game, length + 1)
+        return self.graphs.put(key, self.graphs.render(series, player_name))
+
+
     def events_embed(self, match) -> discord.Embed:
         for player in match.players.players:
             player.tasks = 0
             if player.team == "impostor": 
                 player.color +=100
         votes_embed = discord.Embed(title=f"Match ID: {match.id} - Events", description="")
-        events_df = pd.read_json(os.path.join(self.matches_path, match.event_file_name), typ='series')
-        
-        meeting_count = 0
-        meeting_end = False
-        meeting_start = False
-
-        events_embed = f"__**Round {meeting_count+1} Actions**__\n"
-        for event in events_df:
-            event_type = event.get('Event')
-            for key in ['Name', 'Player', 'Target', 'Killer']:
-                if key in event:
-                    if event[key].endswith(" |"):
-                        event[key] = event[key][:-2] 
-                
-            if event_type == "Task":
-                player = match.players.get_player_by_name(event.get('Name'))
-                player.finished_task()
-                if player.tasks == 10:
-                    color_emoji = default_color_emojis.get(player.color, "?")
-                    events_embed += f"{color_emoji} Tasks {done_emoji} {'Alive' if player.alive else 'Dead'}\n"
-
-            elif event_type == "PlayerVote":
-                player = match.players.get_player_by_name(event.get('Player'))
-                target = match.players.get_player_by_name(event.get('Target'))
-                player_emoji = default_color_emojis.get(player.color, "?")
-                if target == None:
-                    events_embed += f" {player_emoji} Skipped\n"
-                else:
-                    target_emoji = default_color_emojis.get(target.color, "?")
-                    events_embed += f" {player_emoji} voted {target_emoji}\n"
-                    
-            elif event_type == "Death":
-                player = match.players.get_player_by_name(event.get('Name'))
-                killer = match.players.get_player_by_name(event.get('Killer'))
-                player_emoji = default_color_emojis.get(player.color+200, "?")
-                killer_emoji = default_color_emojis.get(killer.color, "?")
-                events_embed += f" {killer_emoji} {kill_emoji} {player_emoji}\n"
-                
-            elif event_type == "BodyReport":
-                player = match.players.get_player_by_name(event.get('Player'))
-                dead_player = match.players.get_player_by_name(event.get('DeadPlayer'))
-                player_emoji = default_color_emojis.get(player.color, "?")
-                dead_emoji = default_color_emojis.get(dead_player.color+200, "?")
-                events_embed += f" {player_emoji} {report_emoji} {dead_emoji}\n"
-                meeting_start = True
-                meeting_count+=1
-                
-            elif event_type == "MeetingStart":
-                player = match.players.get_player_by_name(event.get('Player'))
-                player_emoji = default_color_emojis.get(player.color, "?")
-                events_embed += f" {player_emoji} {emergency_emoji} Meeting\n"
-                meeting_start = True
-                meeting_count+=1
-                
-            elif event_type == "Exiled":
-                ejected_player = match.players.get_player_by_name(event.get('Player'))
-                ejected_emoji = default_color_emojis.get(ejected_player.color, "?")
-                events_embed += f"{ejected_emoji} __was **Ejected**__\n"
-                meeting_end = True
-                events_embed += f"Meeting End\n"
-            
-            elif event_type == "GameCancel":
-                events_embed += f"__**Game {match.id} Canceled**__\n"
-                
-          
-            elif event_type == "ManualGameEnd":
-                events_embed += f"__**Manual End**__\n"
-                break
-
-            elif event_type == "Disconnect":
-                disconnected_player = match.players.get_player_by_name(event.get('Name'))
-                disconnected_emoji = default_color_emojis.get(disconnected_player.color, "?")
-                events_embed += f"{disconnected_emoji}{'__** Disconnected Alive**__' if disconnected_player.alive else 'Disconnected Dead'}\n"
-                
-            elif event_type == "MeetingEnd":
-                if (event.get("Result") == "Exiled"):
-                    continue
-
-                elif (event.get("Result") == "Tie"):
-                    events_embed += f"__**Votes Tied**__\n"
-                else:
-                    events_embed += f"__**Skipped**__\n"
-                meeting_end = True
-                events_embed += f"Meeting End\n"
-
-            if meeting_end == True:
-                if len(events_embed) >= 1023:
-                    self.logger.error(events_embed)
-                votes_embed.add_field(name = "", value=events_embed, inline=True)
-                events_embed = ""
-                events_embed += f"__**Round {meeting_count+1} Actions**__\n"
-                meeting_end = False 
-
-            elif meeting_start == True:
-                events_embed += f"__Meeting #{meeting_count}__\n"
-                meeting_start = False
-
-        
-        events_embed += f"**Match {match.id} Ended**\n"
-        events_embed += f"**{match.result}**"
-        votes_embed.add_field(name = "", value=events_embed, inline=True)
+        _, decoder, events = self.file_handler.parser.read_match(match.match_file_name) # json files or a season archive
+        engine = EventEngine(match.players, decoder, clean_names=True)
+        renderer = engine.subscribe(EventsEmbedRenderer(match, votes_embed, self.logger))
+        engine.run(events)
+        renderer.finish()
         votes_embed.set_footer(text=f"Bot Programmed by Aiden | Version: {self.version}", icon_url=self.guild.icon.url)
         return votes_embed
 
@@ -1026,22 +970,26 @@ class DiscordBot(commands.Bot):
             if best_match is not None:
                 self.logger.info(f"found {best_match[1].display_name}")
                 player_name, member = best_match
-                player_row = self.leaderboard.get_player_row(player_name)
-
-                if player_row is None:
-                    self.logger.info(f"Player {player_name} was not found in the leaderboard, creating a new player")
-                    self.leaderboard.new_player(player_name)
-                    self.leaderboard.add_player_discord(player_name, member.id)
-                    self.leaderboard.save_leaderboard()
-
-                if self.leaderboard.get_player_discord(player_row) is None:
-                    self.logger.info(f"Player {player_name} has no discord in the leaderboard, adding discord {member.id}")
-                    self.leaderboard.add_player_discord(player_name, member.id)
-                    self.leaderboard.save_leaderboard()
+                await self.executor.write(self.link_player_discord, player_name, member.id)
             else:
                 self.logger.error(f"Can't find a match a player for member {member.display_name}")
 
 
+    def link_player_discord(self, player_name, discord_id):
+        player_row = self.leaderboard.get_player_row(player_name)
+
+        if player_row is None:
+            self.logger.info(f"Player {player_name} was not found in the leaderboard, creating a new player")
+            self.leaderboard.new_player(player_name)
+            self.leaderboard.add_player_discord(player_name, discord_id)
+            self.leaderboard.save_leaderboard()
+
+        if self.leaderboard.get_player_discord(player_row) is None:
+            self.logger.info(f"Player {player_name} has no discord in the leaderboard, adding discord {discord_id}")
+            self.leaderboard.add_player_discord(player_name, discord_id)
+            self.leaderboard.save_leaderboard()
+
+
     async def handle_game_start(self, json_data):
         match_id = json_data.get("MatchID", "")
         game_code = json_data.get("GameCode", "")
@@ -1360,18 +1308,18 @@ class DiscordBot(commands.Bot):
         if self.auto_mute:
             await self.game_end_automute(voice_channel, voice_channel_id)
 
-        last_match = self.file_handler.process_match_by_id(match_id)
+        last_match = await self.executor.write(self.file_handler.process_match_by_id, match_id)
         for i in range(10):
             if last_match.result == "Unknown":
                 await asyncio.sleep(1)
-                last_match = self.file_handler.process_match_by_id(match_id)
+                last_match = await self.executor.write(self.file_handler.process_match_by_id, match_id)
                 if i == 9:
                     self.logger.warning(f"Match {match_id} was not loaded correctly")
             else:
                 break
 
         end_embed = self.end_game_embed(json_data, last_match)
-        events_embed = self.events_embed(last_match)
+        events_embed = await self.executor.render(self.events_embed, last_match)
         view = VotesView(embed=events_embed)
 
         await self.get_channel(text_channel_id).send(embed=end_embed, view=view)
@@ -1382,42 +1330,48 @@ class DiscordBot(commands.Bot):
         game_channel['members_in_match'] = []
         
 
-    async def handle_client(self, reader, writer):
-        data = await reader.read(1024)
-        message = data.decode('utf-8')
-        self.logger.debug(f"Received: {message}") 
+    async def handle_event(self, json_data):
+        event_name = json_data.get("EventName")
+        match_id = json_data.get("MatchID", "")
+        game_code = json_data["GameCode"]
 
-        try:
-            json_data = json.loads(message)
-            event_name = json_data.get("EventName")
-            match_id = json_data.get("MatchID", "")
-            game_code = json_data["GameCode"]
-
-            if event_name == "GameStart":
-                self.logger.info(f"Game ID:{match_id} Started. - Code({game_code})")
-                await self.handle_game_start(json_data)
-
-            elif event_name == "MeetingStart":
-                self.logger.info(f"Game Code:{game_code} Meeting Started.")
-                if self.auto_mute:
-                    await self.handle_meeting_start(json_data) #this is automute
-
-            elif event_name == "MeetingEnd":
-                self.logger.info(f"Game Code:{game_code} Meeting Endded.")
-                if self.auto_mute:
-                    await self.handle_meeting_end(json_data) #this is automute
-
-            elif event_name == "GameEnd":
-                self.logger.info(f"Game ID:{match_id} Endded. - Code({game_code})")
-                await self.handle_game_end(json_data)
-                
-            else:
-                self.logger.info("Unsupported event:", event_name)
+        if event_name == "GameStart":
+            self.logger.info(f"Game ID:{match_id} Started. - Code({game_code})")
+            await self.handle_game_start(json_data)
+
+        elif event_name == "MeetingStart":
+            self.logger.info(f"Game Code:{game_code} Meeting Started.")
+            if self.auto_mute:
+                await self.handle_meeting_start(json_data) #this is automute
+
+        elif event_name == "MeetingEnd":
+            self.logger.info(f"Game Code:{game_code} Meeting Endded.")
+            if self.auto_mute:
+                await self.handle_meeting_end(json_data) #this is automute
+
+        elif event_name == "GameEnd":
+            self.logger.info(f"Game ID:{match_id} Endded. - Code({game_code})")
+            await self.handle_game_end(json_data)
+            
+        else:
+            self.logger.info(f"Unsupported event: {event_name}")
 
-        except json.JSONDecodeError as e:
-            self.logger.error("Error decoding JSON:", e)
-        except Exception as e:
-            self.logger.error("Error processing event:", e, message)
+
+    async def handle_client(self, reader, writer):
+        # the plugin keeps its connection open, every frame on it is one event queued for its game's worker
+        try:
+            async for flags, payload in read_frames(reader):
+                try:
+                    json_data = decode_payload(flags, payload)
+                except (json.JSONDecodeError, UnicodeDecodeError, zlib.error) as e:
+                    self.logger.error(f"Error decoding message: {e}")
+                    continue
+                self.logger.debug(f"Received: {json_data}")
+                self.dispatcher.submit(json_data)
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError) as e:
+            self.logger.error(f"Plugin connection dropped: {e}")
+        finally:
+            writer.close()
     
     
     async def start_server(self):
@@ -1427,11 +1381,145 @@ class DiscordBot(commands.Bot):
             await server.serve_forever()
 
 
+    async def flush_leaderboard_periodically(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.executor.write(self.leaderboard.flush)
+
+
     async def start_bot(self):
-        await asyncio.gather(
-            self.start_server(),
-            super().start(self.token)
-        )
+        try:
+            await asyncio.gather(
+                self.start_server(),
+                self.flush_leaderboard_periodically(),
+                super().start(self.token)
+            )
+        finally:
+            await self.dispatcher.close()
+            self.executor.shutdown()
+            self.file_handler.close()
+            self.logger.info("Leaderboard flushed to disk on shutdown")
+
+class EventsEmbedRenderer:
+    def __init__(self, match, votes_embed, logger):
+        # writes one embed field per round of the match's events
+        self.match = match
+        self.votes_embed = votes_embed
+        self.logger = logger
+        self.engine = None
+        self.meeting_count = 0
+        self.meeting_end = False
+        self.meeting_start = False
+        self.events_embed = f"__**Round {self.meeting_count+1} Actions**__\n"
+
+
+    def register(self, engine):
+        self.engine = engine
+        engine.on(EventType.TASK, self.task)
+        engine.on(EventType.PLAYER_VOTE, self.player_vote)
+        engine.on(EventType.DEATH, self.death)
+        engine.on(EventType.BODY_REPORT, self.body_report)
+        engine.on(EventType.MEETING_START, self.meeting)
+        engine.on(EventType.EXILED, self.exiled)
+        engine.on(EventType.GAME_CANCEL, self.game_cancel)
+        engine.on(EventType.MANUAL_GAME_END, self.manual_game_end)
+        engine.on(EventType.DISCONNECT, self.disconnect)
+        engine.on(EventType.MEETING_END, self.meeting_result)
+        engine.on_every_event(self.round_break)
+
+
+    def task(self, event, who):
+        player = who.name
+        player.finished_task()
+        if player.tasks == 10:
+            color_emoji = default_color_emojis.get(player.color, "?")
+            self.events_embed += f"{color_emoji} Tasks {done_emoji} {'Alive' if player.alive else 'Dead'}\n"
+
+
+    def player_vote(self, event, who):
+        player_emoji = default_color_emojis.get(who.player.color, "?")
+        if who.target == None:
+            self.events_embed += f" {player_emoji} Skipped\n"
+        else:
+            target_emoji = default_color_emojis.get(who.target.color, "?")
+            self.events_embed += f" {player_emoji} voted {target_emoji}\n"
+
+
+    def death(self, event, who):
+        player_emoji = default_color_emojis.get(who.name.color+200, "?")
+        killer_emoji = default_color_emojis.get(who.killer.color, "?")
+        self.events_embed += f" {killer_emoji} {kill_emoji} {player_emoji}\n"
+
+
+    def body_report(self, event, who):
+        player_emoji = default_color_emojis.get(who.player.color, "?")
+        dead_emoji = default_color_emojis.get(who.dead_player.color+200, "?")
+        self.events_embed += f" {player_emoji} {report_emoji} {dead_emoji}\n"
+        self.meeting_start = True
+        self.meeting_count+=1
+
+
+    def meeting(self, event, who):
+        player_emoji = default_color_emojis.get(who.player.color, "?")
+        self.events_embed += f" {player_emoji} {emergency_emoji} Meeting\n"
+        self.meeting_start = True
+        self.meeting_count+=1
+
+
+    def exiled(self, event, who):
+        ejected_emoji = default_color_emojis.get(who.player.color, "?")
+        self.events_embed += f"{ejected_emoji} __was **Ejected**__\n"
+        self.meeting_end = True
+        self.events_embed += f"Meeting End\n"
+
+
+    def game_cancel(self, event, who):
+        self.events_embed += f"__**Game {self.match.id} Canceled**__\n"
+
+
+    def manual_game_end(self, event, who):
+        self.events_embed += f"__**Manual End**__\n"
+        self.engine.stop()
+
+
+    def disconnect(self, event, who):
+        disconnected_player = who.name
+        disconnected_emoji = default_color_emojis.get(disconnected_player.color, "?")
+        self.events_embed += f"{disconnected_emoji}{'__** Disconnected Alive**__' if disconnected_player.alive else 'Disconnected Dead'}\n"
+
+
+    def meeting_result(self, event, who):
+        if (event.result == "Exiled"): # the EXILED event already closed the meeting
+            return
+        elif (event.result == "Tie"):
+            self.events_embed += f"__**Votes Tied**__\n"
+        else:
+            self.events_embed += f"__**Skipped**__\n"
+        self.meeting_end = True
+        self.events_embed += f"Meeting End\n"
+
+
+    def round_break(self, event, who):
+        if event.type == EventType.MEETING_END and event.result == "Exiled":
+            return
+        if self.meeting_end == True:
+            if len(self.events_embed) >= 1023:
+                self.logger.error(self.events_embed)
+            self.votes_embed.add_field(name = "", value=self.events_embed, inline=True)
+            self.events_embed = ""
+            self.events_embed += f"__**Round {self.meeting_count+1} Actions**__\n"
+            self.meeting_end = False 
+
+        elif self.meeting_start == True:
+            self.events_embed += f"__Meeting #{self.meeting_count}__\n"
+            self.meeting_start = False
+
+
+    def finish(self):
+        self.events_embed += f"**Match {self.match.id} Ended**\n"
+        self.events_embed += f"**{self.match.result}**"
+        self.votes_embed.add_field(name = "", value=self.events_embed, inline=True)
+
 
 class VotesView(discord.ui.View):
     def __init__(self, *, timeout=None, embed=None):
@@ -1464,7 +1552,14 @@ if __name__ == "__main__":
         'admin_logs_channel' : 1236981166461157417,
         'matches_path' : "~/impServer/plugins/MatchLogs/Preseason/",
         'database_location' : "leaderboard_preseason.csv",
-        'season_name' : "Pre-Season"
+        'season_name' : "Pre-Season",
+        'write_behind' : True,
+        'flush_interval' : 30,
+        'parse_workers' : None,
+        'max_pending_events' : 32,
+        'render_workers' : 2,
+        'graph_cache_size' : 256,
+        'graph_points' : 500
     }
     bot = DiscordBot(token=token, variables=variables)
 
@@ -0,0 +1,69 @@
+from typing import NamedTuple
+from match_decoder import NO_NAME
+from player_in_match import PlayerInMatch
+
+class EventPlayers(NamedTuple):
+    # the players an event refers to, resolved once and handed to every handler
+    name: PlayerInMatch
+    player: PlayerInMatch
+    target: PlayerInMatch
+    killer: PlayerInMatch
+    dead_player: PlayerInMatch
+
+
+class EventEngine:
+    def __init__(self, players, decoder, clean_names=False):
+        # one pass over a match's decoded events, consumers register handlers per EventType
+        self.players = players
+        self.decoder = decoder
+        self.clean_names = clean_names # drop the " |" some logs append to names before resolving them
+        self.handlers = {}
+        self.after_event = []
+        self.player_ids = {NO_NAME: None} # decoded name id -> match player id
+        self.stopped = False
+
+
+    def on(self, event_type, handler):
+        self.handlers.setdefault(event_type, []).append(handler)
+
+
+    def on_every_event(self, handler):
+        self.after_event.append(handler)
+
+
+    def subscribe(self, consumer):
+        consumer.register(self)
+        return consumer
+
+
+    def stop(self):
+        self.stopped = True
+
+
+    def player(self, name_id):
+        if name_id not in self.player_ids:
+            name = self.decoder.name(name_id)
+            if self.clean_names and name is not None and name.endswith(" |"):
+                name = name[:-2]
+            self.player_ids[name_id] = self.players.get_player_id(name)
+        return self.players.get_player_by_id(self.player_ids[name_id])
+
+
+    def resolve(self, event):
+        player = self.player
+        return EventPlayers(player(event.name), player(event.player), player(event.target),
+                            player(event.killer), player(event.dead_player))
+
+
+    def run(self, events):
+        for event in events:
+            handlers = self.handlers.get(event.type, ())
+            if not handlers and not self.after_event:
+                continue
+            who = self.resolve(event)
+            for handler in handlers:
+                handler(event, who)
+            if self.stopped:
+                break
+            for handler in self.after_event:
+                handler(event, who)
@@ -1,16 +1,26 @@
 import pandas as pd
 import os
-from player_in_match import PlayerInMatch
 from players_list import PlayersList
 from match_class import Match
 from leaderboard import Leaderboard
+from match_index import MatchIndex
+from processed_matches import ProcessedMatchesJournal
+from replay import SeasonReplay
+from checkpoints import CheckpointStore
+from aliases import PlayerAliases
+from season_archive import SeasonArchives
+from match_decoder import decode_time, TIME_FORMAT
+from match_parser import MatchParser, parse_match_file
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 from datetime import datetime
 import json 
 import logging
 import numpy as np
 
 class FileHandler:
-    def __init__(self, matches_path, database_location):
+    def __init__(self, matches_path, database_location, write_behind=False, flush_interval=30, workers=1, progress_interval=500,
+                 checkpoint_interval=250):
         logging.getLogger("os").setLevel(logging.CRITICAL)
         logging.getLogger("pandas").setLevel(logging.CRITICAL)
         logging.getLogger("json").setLevel(logging.CRITICAL)
@@ -19,15 +29,33 @@ class FileHandler:
         self.logger = logging.getLogger('FileHandler')
         self.matches_path = os.path.expanduser(matches_path)
         self.processed_matches_csv = "processed_matches.csv"
+        self.processed_matches = ProcessedMatchesJournal(self.processed_matches_csv)
+        self.archives = SeasonArchives(self.matches_path)
+        self.match_index = MatchIndex(self.matches_path, "match_index.jsonl", self.archives)
+        self.aliases = PlayerAliases(f"{os.path.splitext(database_location)[0]}_aliases.jsonl")
+        self.parser = MatchParser(self.matches_path, self.aliases, self.archives)
+        self.workers = workers or os.cpu_count() # processes parsing matches during a backfill, None uses every core
+        self.progress_interval = progress_interval
         self.database_location = database_location
-        self.leaderboard = Leaderboard(database_location)
+        self.leaderboard = Leaderboard(database_location, write_behind, flush_interval)
+        self.checkpoints = CheckpointStore(f"{os.path.splitext(database_location)[0]}_checkpoints", checkpoint_interval)
+        if self.leaderboard.leaderboard.empty and len(self.processed_matches):
+            # the journal lists matches the leaderboard doesn't hold, process them again
+            self.logger.warning(f"Leaderboard {database_location} is empty, {len(self.processed_matches)} processed matches will be processed again")
+            self.processed_matches.replace(set())
+        if not len(self.processed_matches): # a new season
+            self.checkpoints.clear()
+            self.checkpoints.restart()
+        else:
+            self.restore_checkpoint_counts()
         self.match = Match()
 
 
-    def df_from_json(self, path, json_file):
-        match_df = pd.read_json(os.path.join(path, json_file), typ='series')
-        events_df = pd.read_json(os.path.join(path, match_df.eventsLogFile), typ='series')
-        return match_df, events_df
+    def restore_checkpoint_counts(self):
+        # the journal lists the matches of the saved leaderboard, checkpoints count on from the latest started of them
+        processed_files = [file for file in self.get_sorted_files_with_match() if file in self.processed_matches]
+        last_key = self.match_key(processed_files[-1]) if processed_files else None
+        self.checkpoints.restart(last_key, len(processed_files))
 
 
     def get_players_info_from_leaderboard(self, players_list : PlayersList):
@@ -35,33 +63,24 @@ class FileHandler:
             old_player = self.leaderboard.is_player_in_leaderboard(player.name)
             if not old_player:
                 self.leaderboard.new_player(player.name)
-            player_row = self.leaderboard.get_player_row(player.name)
-            player.crewmate_current_mmr = self.leaderboard.get_player_crew_mmr(player_row)
-            player.impostor_current_mmr = self.leaderboard.get_player_imp_mmr(player_row)
-            player.current_mmr = self.leaderboard.get_player_mmr(player_row)
-            player.discord = self.leaderboard.get_player_discord(player_row)
-
-
-    def get_players_from_df(self, match_df) -> PlayersList:
-        players_array = [x.strip() for x in match_df.players.split(',')]
-        impostors_array = match_df.impostors.split(", ")
-        players_list = PlayersList()
-        result = match_df.result
-        for player_name in players_array:
-            team = "impostor" if player_name in impostors_array else "crewmate"
-            players_list.add_player(PlayerInMatch(name=player_name, team=team))
+            (player.leaderboard_id, player.current_mmr, player.crewmate_current_mmr,
+             player.impostor_current_mmr, player.discord) = self.leaderboard.get_player_info(player.name)
+
+
+    def rate_match(self, match : Match):
+        # everything that depends on the leaderboard, has to run in match order
+        players_list = match.players
         self.get_players_info_from_leaderboard(players_list)
-        # self.logger.debug(f"Imported Players data from leaderboard for match {match_df.MatchID}")
+        # self.logger.debug(f"Imported Players data from leaderboard for match {match.id}")
         try:
             players_list.calculate_total_mmr()
-            # self.logger.debug(f"Calculated MMR changes for match {match_df.MatchID}")
+            # self.logger.debug(f"Calculated MMR changes for match {match.id}")
         except Exception as e:
-            self.logger.error(f"Error calculating MMR for match {match_df.eventsLogFile} {e}")
+            self.logger.error(f"Error calculating MMR for match {match.event_file_name} {e}")
 
         self.calculate_percentage_of_winning(players_list)
-        players_list.who_won(result)
-        
-        return players_list
+        players_list.who_won(match.result)
+        return match
 
 
     def calculate_percentage_of_winning(self, players:PlayersList):
@@ -101,191 +120,106 @@ class FileHandler:
         # d = -0.19883086302819628
 
 
-    def match_from_dataframe(self, match_df, events_df, players_list):
-        self.logger.debug(f"Filling Match {match_df.MatchID} object from the events file")
-        match = Match(id=match_df.MatchID, match_start_time=match_df.gameStarted,
-                      result=match_df.result, players=players_list, event_file_name=match_df.eventsLogFile)
-        death_happened = False
-        meeting_called_after_death = False
-        match_end_time = match_df.gameStarted
-        players_alive = 10
-        imps_alive = 2
-
-        for event in events_df:
-            event_type = event.get('Event')
-            if event_type == "Task":
-                player_name = event.get('Name')
-                match.players.get_player_by_name(player_name).finished_task()
-
-            elif event_type == "PlayerVote":
-                if death_happened:
-                    meeting_called_after_death = True
-                    
-                player_name = event.get('Player')
-                if match.players.is_player_impostor(event.get('Target')):
-                    match.players.get_player_by_name(player_name).correct_vote()
-                    
-                elif event.get('Target') !='none':
-                    match.players.get_player_by_name(player_name).incorrect_vote()
-
-                match.players.get_player_by_name(player_name).last_voted = event.get('Target')
-
-                if match_end_time < event.get('Time'):
-                    match_end_time = event.get('Time')
-
-            elif event_type == "Death":
-                players_alive -= 1 # one player killed
-                death_happened = True
-                player_name = event.get('Name')
-                match.players.get_player_by_name(player_name).alive = False
-                match.players.get_player_by_name(player_name).time_of_death = event.get('Time')
-                if meeting_called_after_death:
-                    match.players.get_player_by_name(player_name).died_first_round = False
-                else:
-                    match.players.get_player_by_name(player_name).died_first_round = True
-                killer = match.players.get_player_by_name(event.get('Killer'))
-
-                if killer and killer.solo_imp: killer.kills_as_solo_imp += 1
-
-            elif event_type == "BodyReport":
-                meeting_called_after_death = True
-
-            elif event_type == "MeetingStart":
-                if death_happened:
-                    meeting_called_after_death = True
-
-            elif event_type == "Exiled":
-                ejected_player_name = event.get('Player')
-                match.players.get_player_by_name(ejected_player_name).alive = False
-                match.players.get_player_by_name(ejected_player_name).time_of_death = event.get('Time')
-                ejected_imp = match.players.is_player_impostor(event.get('Player'))
-                if ejected_imp:
-                    impostors = match.players.get_players_by_team("impostor")
-                    for imp in impostors:
-                        if imp.name != ejected_player_name and players_alive >= 7:
-                            imp.solo_imp = True
-                    imps_alive -= 1
-
-                    for player in match.players.players:
-                        if players_alive >= 7:
-                            player.ejected_early_as_imp = True
-                        if player.last_voted == ejected_player_name: #crewmate voted an imp out
-                            player.correct_vote_on_eject +=1
-
-                else: # voted a crewmate 
-                    for player in match.players.players:
-                        if player.last_voted == ejected_player_name: # voted a crewmate out
-                            if player.team == "impostor":
-                                player.got_crew_voted +=1
-                            if player.team == "crewmate":
-                                if ((players_alive in [3,4]) or ((players_alive in [5,6,7]) and (imps_alive == 2))) and player.alive:
-                                    player.voted_wrong_on_crit = True
-                        else: #didn't vote the crewmate who got voted
-                            if player.team == "crewmate":
-                                if ((players_alive in [3,4]) or ((players_alive in [5,6,7]) and (imps_alive == 2))) and player.alive:
-                                    player.right_vote_on_crit_but_loss = True
-                players_alive -= 1 # one player ejected
-
-            elif event_type == "MeetingEnd":
-                if (event.get("Result") == "Skipped") and ((players_alive in [5,6]) and (imps_alive == 2)) and player.alive:
-                    for player in match.players.players:
-                        if player.team == "crewmate":
-                            if player.last_voted == "none":
-                                player.voted_wrong_on_crit = True
-                            else: 
-                                voted_imp = match.players.is_player_impostor(player.last_voted)
-                                if not voted_imp:
-                                    player.voted_wrong_on_crit = True
-
-        for player in match.players.players:
-            if player.time_of_death is None:
-                player.time_of_death = match_end_time
-        match.match_end_time = match_end_time
-        return match
-
-
     def calculate_mmr_gain_loss(self, match):
         for player in match.players.players:
             player.calculate_performance_and_mmr()
 
 
     def update_leaderboard(self, match):
-        for player in match.players.players:
-            self.leaderboard.update_player(player)
+        self.leaderboard.apply_match(match)
 
 
     def match_from_file(self, json_file=None) -> Match:
-        try:
-            match_df, events_df = self.df_from_json(self.matches_path, json_file)
-        except Exception as e:
-            self.logger.error(str(e)+"Error reading match from file"+str(json_file))
-            return None
-
-        if match_df.result in ["Canceled", "Cancelled", "Unknown"] or events_df is None or match_df is None:
-            try:
-                players_list = self.get_players_from_df(match_df)
-                match = self.match_from_dataframe(match_df, events_df, players_list)
-                match.match_file_name = json_file
-                return match
-            except:
-                self.logger.error(f"Error with file {match_df.eventsLogFile}")
-
-        players_list = self.get_players_from_df(match_df)
-        match = self.match_from_dataframe(match_df, events_df, players_list)
-        match.match_file_name = json_file
+        match = self.parser.parse(json_file)
+        if match:
+            self.rate_match(match)
         return match
+
+
+    def parse_matches(self, files):
+        # parsing runs in parallel, matches are still yielded in the order of files
+        if self.workers <= 1 or len(files) <= self.workers:
+            for file in files:
+                yield self.parser.parse(file)
+            return
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            chunksize = max(1, min(32, len(files) // (self.workers * 4)))
+            yield from executor.map(parse_match_file, repeat(self.matches_path), repeat(self.aliases), files, chunksize=chunksize)
         
 
     def get_sorted_files_with_match(self):
-        files = os.listdir(self.matches_path)
-        filtered_files = [file for file in files if "match.json" in file.lower()]
-        sorted_files = sorted(filtered_files, key=lambda x: self.get_game_started_timestamp(x))
-        return sorted_files
+        return self.match_index.sorted_files()
 
 
     def get_game_started_timestamp(self, file_name):
-        file_path = os.path.join(self.matches_path, file_name)
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            game_started = data["gameStarted"]
-            game_started_time = datetime.strptime(game_started, "%m/%d/%Y %H:%M:%S")
-            return game_started_time
+        game_started = self.match_index.get(file_name)["gameStarted"]
+        game_started_time = datetime.strptime(game_started, "%m/%d/%Y %H:%M:%S")
+        return game_started_time
+
+
+    def commit_match(self, match):
+        self.rate_match(match)
+        if match.result == "Canceled" or match.result == "Unknown":
+            self.logger.info(f"Skipped {match.match_file_name} because result is {match.result}")
+        else:
+            # res = 0
+            # if match.result == "Crewmates Win":
+            #     res = 1
+            # data_df = pd.concat([pd.DataFrame([[match.players.avg_impostor_mmr,match.players.avg_crewmate_mmr,res]], columns=data_df.columns), data_df], ignore_index=True)
+            self.logger.info(f"Processed Match ID:{match.id}")
+            self.calculate_mmr_gain_loss(match)
+            self.update_leaderboard(match)
+        return match
+
+
+    def apply_matches(self, files, processed_matches):
+        # files have to be in gameStarted order, returns the match read from the last file
+        match = None
+        for count, (file, match) in enumerate(zip(files, self.parse_matches(files)), 1):
+            if match:
+                self.commit_match(match)
+                processed_matches.add(file)
+                self.checkpoints.match_committed(self.match_key(file), self.leaderboard)
+                if processed_matches is self.processed_matches and not self.leaderboard.dirty:
+                    # the saved leaderboard counts every match added so far, the journal can list them
+                    processed_matches.commit()
+            if count % self.progress_interval == 0:
+                self.logger.info(f"Processed {count}/{len(files)} matches")
+        return match
 
 
     def process_unprocessed_matches(self):
-        if not os.path.exists(self.processed_matches_csv):
-            pd.DataFrame(columns=['Match File Name']).to_csv(self.processed_matches_csv, index=False)
-        processed_matches = set(pd.read_csv(self.processed_matches_csv)['Match File Name'])
+        processed_matches = self.processed_matches
         sorted_files_with_match = self.get_sorted_files_with_match()
-        match = None
+        unprocessed_files = [file for file in sorted_files_with_match if file not in processed_matches]
         # data_df = pd.DataFrame(columns=['Avg Impostor MMR', 'Avg Crewmate MMR', 'Win Status'])
-        for file in sorted_files_with_match:
-            if file not in processed_matches:
-                match = self.match_from_file(file)
-                if match:
-                    if match.result == "Canceled" or match.result == "Unknown":
-                        self.logger.info(f"Skipped {match.match_file_name} because result is {match.result}")
-                    else:
-                        # res = 0
-                        # if match.result == "Crewmates Win":
-                        #     res = 1
-                        # data_df = pd.concat([pd.DataFrame([[match.players.avg_impostor_mmr,match.players.avg_crewmate_mmr,res]], columns=data_df.columns), data_df], ignore_index=True)
-                        self.logger.info(f"Processed Match ID:{match.id}")
-                        self.calculate_mmr_gain_loss(match)
-                        self.update_leaderboard(match)
-                    processed_matches.add(file)
+        match = self.apply_matches(unprocessed_files, processed_matches)
         # data_df.to_csv('game_data.csv', index=False)
-        pd.DataFrame(processed_matches, columns=['Match File Name']).to_csv(self.processed_matches_csv, index=False)
+        self.leaderboard.flush()
+        processed_matches.sync()
         if match:
             return match
         else:
             return None
 
 
+    def close(self):
+        # the journal only lists matches once the leaderboard counting them is saved
+        self.leaderboard.flush()
+        self.processed_matches.close()
+
+
+    def replay_season(self, since=None):
+        return SeasonReplay(self).run(since)
+
+
+    def match_key(self, match_file_name):
+        # position of a match in the season, what checkpoints are ordered by
+        return [self.match_index.get(match_file_name)['started'] or '', match_file_name]
+
+
     def process_match_by_id(self, match_id):
-        if not os.path.exists(self.processed_matches_csv):
-            pd.DataFrame(columns=['Match File Name']).to_csv(self.processed_matches_csv, index=False)
-        processed_matches = set(pd.read_csv(self.processed_matches_csv)['Match File Name'])  
+        processed_matches = self.processed_matches
         match_file_name = self.find_matchfile_by_id(match_id)
         match = self.match_from_file(match_file_name)
         if match_file_name in processed_matches:
@@ -293,49 +227,46 @@ class FileHandler:
         if match.result != "Canceled" and match.result != "Unknown":
             self.calculate_mmr_gain_loss(match)
             self.update_leaderboard(match)
+            self.leaderboard.flush()
         processed_matches.add(match_file_name)
-        pd.DataFrame(processed_matches, columns=['Match File Name']).to_csv(self.processed_matches_csv, index=False)
+        processed_matches.sync()
+        self.checkpoints.match_committed(self.match_key(match_file_name), self.leaderboard)
         return match
 
 
     def find_matchfile_by_id(self, match_id):
-        json_files = [file for file in os.listdir(self.matches_path) if file.endswith('_match.json')]
-        for match_file_name in json_files:
-            match_file_path = os.path.join(self.matches_path, match_file_name)
-            with open(match_file_path, 'r') as f:
-                match_data = json.load(f)
-                if str(match_data.get('MatchID')) == str(match_id):
-                    return match_file_name
-        return None
+        return self.match_index.find(match_id)
 
 
-    def change_result_to_cancelled(self, match_id):
+    def change_match_result(self, match_id, result):
+        # rewrites the result in the match file, then replays from the last checkpoint before it so every later match is corrected too
+        match_file_name = self.find_matchfile_by_id(match_id)
+        if self.archives.archive_of(match_file_name) is not None:
+            self.logger.error(f"Match {match_id} is in a season archive - Could not change its result")
+            return False
+        file_path = os.path.join(self.matches_path, match_file_name)
+        with open(file_path, 'r') as f:
+            match_data = json.load(f)
+        match_data['result'] = result
+        with open(file_path, 'w') as f:
+            json.dump(match_data, f, indent=4)
+        self.match_index.get(match_file_name)
+        self.replay_season(since=match_file_name)
+        return self.match_from_file(match_file_name)
 
+
+    def change_result_to_cancelled(self, match_id):
         match_file_name = self.find_matchfile_by_id(match_id)
         if match_file_name is None:
             self.logger.error(f"Can't find {match_id} - Could not change match to Cancelled")
             return False
 
-        match = self.match_from_file(match_file_name)
-        if match.result == "Canceled":
+        if self.match_index.get(match_file_name)['result'] == "Canceled":
             self.logger.info(f"Match {match_id} is already a Cancel")
             return False
         
         self.logger.info(f"Changing match {match_id} to Canceled")
-        for player in match.players.players:
-            player.canceled = True
-
-        self.calculate_mmr_gain_loss(match)
-        self.update_leaderboard(match)
-
-        match.result == 'Canceled'
-        file_path = os.path.join(self.matches_path, match_file_name)
-        with open(file_path, 'r') as f:
-            match_data = json.load(f)
-        match_data['result'] = 'Canceled'
-        with open(file_path, 'w') as f:
-            json.dump(match_data, f, indent=4)
-        return match
+        return self.change_match_result(match_id, 'Canceled')
     
 
     def change_result_to_crew_win(self, match_id):
@@ -344,19 +275,10 @@ class FileHandler:
             self.logger.error(f"Can't find {match_id} - Could not change match to a Crewmates Win")
             return False
         
-        file_path = os.path.join(self.matches_path, match_file_name)
-        with open(file_path, 'r') as f:
-            match_data = json.load(f)
-        if match_data['result'] != 'Crewmates Win':
-            self.change_result_to_cancelled(match_id)
-            match_data['result'] = 'Crewmates Win'
-            with open(file_path, 'w') as f:
-                json.dump(match_data, f, indent=4)
-            match = self.match_from_file(match_file_name)
-            self.calculate_mmr_gain_loss(match)
-            self.update_leaderboard(match)
+        if self.match_index.get(match_file_name)['result'] != 'Crewmates Win':
+            match = self.change_match_result(match_id, 'Crewmates Win')
             self.logger.info(f"Changed {match_id} to a Crewmates Win")
-            return True
+            return match
         else:
             self.logger.error(f"Match {match_id} Is already a Crewmates Win")
             return False
@@ -368,19 +290,10 @@ class FileHandler:
             self.logger.error(f"Can't find {match_id} - Could not change match to Impostors Win")
             return False
         
-        file_path = os.path.join(self.matches_path, match_file_name)
-        with open(file_path, 'r') as f:
-            match_data = json.load(f)
-        if match_data['result'] != 'Impostors Win': 
-            self.change_result_to_cancelled(match_id)
-            match_data['result'] = 'Impostors Win'
-            with open(file_path, 'w') as f:
-                json.dump(match_data, f, indent=4)
-            match = self.match_from_file(match_file_name)
-            self.calculate_mmr_gain_loss(match)
-            self.update_leaderboard(match)
+        if self.match_index.get(match_file_name)['result'] != 'Impostors Win': 
+            match = self.change_match_result(match_id, 'Impostors Win')
             self.logger.error(f"Changed {match_id} to an Impostors Win")
-            return True
+            return match
         else:
             self.logger.error(f"Match {match_id} Is already an Impostors Win")
             return False
@@ -391,63 +304,19 @@ class FileHandler:
         if match_file_name is None:
             self.logger.error(f"Can't find {match_id} - Could not generate info for this match")
             return None
-        file_path = os.path.join(self.matches_path, match_file_name)
-        with open(file_path, 'r') as f:
-            match_data = json.load(f)
-        return match_data
+        return self.parser.read_match_data(match_file_name)
     
 
     def change_player_name(self, old_name, new_name):
-        def read_json_file(filename):
-            with open(os.path.join(self.matches_path, filename), 'r') as file:
-                return json.load(file)
-    
-        def write_json_file(filename, data):
-            with open(os.path.join(self.matches_path, filename), 'w') as file:
-                json.dump(data, file, indent=4)
-
-        for filename in os.listdir(self.matches_path):
-            if filename.endswith('.json'):
-                data = read_json_file(filename)
-                change_made = False
-                
-                if 'players' in data:
-                    players = data['players'].split(',')
-                    if old_name in players:
-                        players[players.index(old_name)] = new_name
-                        data['players'] = ','.join(players)
-                        self.logger.debug(f"Player name '{old_name}' updated to '{new_name}' in {filename}")
-                        change_made = True
-                    impostors = data.get('impostors', '').split(', ')
-                    if old_name in impostors:
-                        impostors[impostors.index(old_name)] = new_name
-                        data['impostors'] = ', '.join(impostors)
-                        self.logger.debug(f"Impostor name '{old_name}' updated to '{new_name}' in {filename}")
-                        change_made = True
-
-                if isinstance(data, list):
-                    for event in data:
-                        for key in ['Name', 'Player', 'Target', 'Killer','DeadPlayer', 'Impostors']:
-                            if key in event:
-                                if event[key].endswith(" |"):
-                                    event[key] = event[key][:-2]  # Remove last two characters
-                                if event[key] == old_name:
-                                    change_made = True
-                                    event[key] = new_name
-                                if key == 'Impostors':
-                                    if old_name in event[key].split(','): 
-                                        event[key] = event[key].replace(old_name, new_name)
-                                        change_made = True
-                if change_made: 
-                    write_json_file(filename, data)
-                    self.logger.debug(f"Player name '{old_name}' updated to '{new_name}' in {filename}")
-
+        # the logs keep the old name, the alias table maps it to the player at decode time
         player_row = self.leaderboard.get_player_row(old_name)
-        if player_row is not None:
-            index = player_row['Rank']
-            self.leaderboard.leaderboard.at[index, 'Player Name'] = new_name
-            self.leaderboard.save_leaderboard()
+        if player_row is None:
+            self.logger.error(f"Can't find player '{old_name}' - Could not change name to '{new_name}'")
+            return False
+        if self.leaderboard.change_player_name(old_name, new_name):
+            self.aliases.rename(player_row['Player ID'], old_name, new_name, decode_time(datetime.now().strftime(TIME_FORMAT)))
             self.logger.debug(f"Player name '{old_name}' updated to '{new_name}' in Leaderboard")
+        return True
 
 
     def mine_matches_data(self): #testing and development only
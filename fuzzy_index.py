@@ -0,0 +1,51 @@
+from collections import Counter
+from rapidfuzz import process
+
+class FuzzyNameIndex:
+    def __init__(self, candidates=50):
+        # trigram -> normalized names, only the best `candidates` names by shared trigrams get rescored
+        self.postings = {}
+        self.keys_by_name = {}
+        self.candidates = candidates
+
+
+    def trigrams(self, name):
+        padded = f"  {name} "
+        return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+    def add(self, name, key):
+        keys = self.keys_by_name.setdefault(name, [])
+        if not keys:
+            for trigram in self.trigrams(name):
+                self.postings.setdefault(trigram, set()).add(name)
+        keys.append(key)
+
+
+    def remove(self, name, key):
+        keys = self.keys_by_name.get(name)
+        if not keys or key not in keys:
+            return
+        keys.remove(key)
+        if not keys:
+            del self.keys_by_name[name]
+            for trigram in self.trigrams(name):
+                names = self.postings.get(trigram)
+                if names is not None:
+                    names.discard(name)
+                    if not names:
+                        del self.postings[trigram]
+
+
+    def search(self, name, score_cutoff=85):
+        if name in self.keys_by_name:
+            return self.keys_by_name[name][0], 100
+        shared = Counter()
+        for trigram in self.trigrams(name):
+            shared.update(self.postings.get(trigram, ()))
+        candidates = [candidate for candidate, _ in shared.most_common(self.candidates)]
+        best_match = process.extractOne(name, candidates, score_cutoff=score_cutoff)
+        if best_match is None:
+            return None
+        best_name, score, _ = best_match
+        return self.keys_by_name[best_name][0], score
@@ -0,0 +1,65 @@
+import asyncio
+import logging
+from collections import deque
+
+class GameEventDispatcher:
+    def __init__(self, handler, max_pending=32, coalesce=("MeetingStart", "MeetingEnd"), clears=("GameEnd",)):
+        # plugin events are queued per GameCode and handled in order by one worker task per game,
+        # so a slow GameEnd holds neither the plugin connection nor another lobby's automute
+        self.logger = logging.getLogger('Discord_Bot')
+        self.handler = handler
+        self.max_pending = max_pending
+        self.coalesce = set(coalesce) # automute events, a newer one makes the pending one pointless
+        self.clears = set(clears) # events after which pending coalesced events of the game don't matter anymore
+        self.queues = {}
+        self.workers = {}
+        self.dropped = 0
+
+
+    def submit(self, event):
+        # returns at once, False when the event had to be dropped
+        game_code = event.get("GameCode")
+        event_name = event.get("EventName")
+        queue = self.queues.setdefault(game_code, deque())
+        if (event_name in self.coalesce or event_name in self.clears) and queue:
+            pending = len(queue)
+            kept = [queued for queued in queue if queued.get("EventName") not in self.coalesce]
+            if len(kept) != pending:
+                queue.clear()
+                queue.extend(kept)
+                self.logger.debug(f"Game Code:{game_code} {event_name} replaced {pending - len(kept)} pending event(s)")
+        if len(queue) >= self.max_pending:
+            self.dropped += 1
+            self.logger.error(f"Game Code:{game_code} has {len(queue)} pending events, dropped {event_name}")
+            return False
+        queue.append(event)
+        if game_code not in self.workers:
+            self.workers[game_code] = asyncio.create_task(self.run_worker(game_code, queue))
+        return True
+
+
+    async def run_worker(self, game_code, queue):
+        try:
+            while queue:
+                event = queue.popleft()
+                try:
+                    await self.handler(event)
+                except Exception as e:
+                    self.logger.error(f"Error processing event: {e} {event}")
+        finally:
+            del self.workers[game_code]
+            if not queue:
+                del self.queues[game_code]
+
+
+    def pending(self, game_code=None):
+        if game_code is not None:
+            return len(self.queues.get(game_code, ()))
+        return sum(len(queue) for queue in self.queues.values())
+
+
+    async def close(self):
+        workers = list(self.workers.values())
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
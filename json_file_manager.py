@@ -1,6 +1,8 @@
 import os
 import json
 from datetime import datetime
+from match_decoder import decode_time
+from season_archive import ARCHIVE_EXTENSION, SeasonArchive, write_archive
 
 class JsonFileManager:
     def __init__(self, directory):
@@ -23,22 +25,17 @@ class JsonFileManager:
                         json_data = json.load(file)
                         game_started = json_data.get('gameStarted')
                         if game_started:
-                            json_files.append((filename, game_started))
+                            json_files.append((filename, datetime.strptime(game_started, '%m/%d/%Y %H:%M:%S'), json_data))
             return json_files
 
         def sort_json_files_by_game_started(json_files):
-            return sorted(json_files, key=lambda x: datetime.strptime(x[1], '%m/%d/%Y %H:%M:%S'))
+            return sorted(json_files, key=lambda x: x[1])
 
         def assign_match_ids(sorted_json_files):
-            for idx, (filename, _) in enumerate(sorted_json_files):
+            for idx, (filename, _, match_data) in enumerate(sorted_json_files):
                 match_id = str(idx)
-                json_data = {'MatchID': idx}
-                # Extract events file name from match_data
-                events_file_name = None
                 # Get events file name from match_data
-                with open(os.path.join(self.directory, filename), 'r') as file:
-                    match_data = json.load(file)
-                    events_file_name = match_data.get('eventsLogFile')
+                events_file_name = match_data.get('eventsLogFile')
                 if events_file_name is None:
                     print(f"Warning: Events file name not found in '{filename}'. Skipping renaming.")
                     continue
@@ -96,7 +93,61 @@ class JsonFileManager:
                     self.write_json_file(filename, data)
                     print(f"Player name '{player_name}' updated to '{new_name}' in {filename}")
 
-# Example usage:
-directory = "MatchLog"
-json_manager = JsonFileManager(directory)
-json_manager.sort_and_assign_match_ids()
\ No newline at end of file
+    def compact_aliases(self, aliases):
+        # offline: writes current names from the alias table into the logs, after which the table starts empty
+        archives = [filename for filename in os.listdir(self.directory) if filename.endswith(ARCHIVE_EXTENSION)]
+        if archives:
+            # archived matches keep the names they were played under and only the alias table maps them to current names
+            raise RuntimeError(f"Can't compact aliases while season archives exist: {', '.join(sorted(archives))}")
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('_match.json'):
+                continue
+            match_data = self.read_json_file(filename)
+            started = decode_time(match_data.get('gameStarted'))
+            players = [aliases.resolve(name.strip(), started) for name in match_data['players'].split(',')]
+            impostors = [aliases.resolve(name, started) for name in match_data['impostors'].split(', ')]
+            if players != [name.strip() for name in match_data['players'].split(',')] or impostors != match_data['impostors'].split(', '):
+                match_data['players'] = ', '.join(players)
+                match_data['impostors'] = ', '.join(impostors)
+                self.write_json_file(filename, match_data)
+
+            events_file = match_data.get('eventsLogFile')
+            if events_file is None or not os.path.exists(os.path.join(self.directory, events_file)):
+                continue
+            events = self.read_json_file(events_file)
+            change_made = False
+            for event in events:
+                for key in ['Name', 'Player', 'Target', 'Killer', 'DeadPlayer']:
+                    if key in event:
+                        resolved = aliases.resolve(event[key], started)
+                        if resolved != event[key]:
+                            event[key] = resolved
+                            change_made = True
+            if change_made:
+                self.write_json_file(events_file, events)
+        aliases.clear()
+        print("Alias compaction completed successfully.")
+
+    def archive_season(self, archive_name="season", remove_files=True):
+        # packs every match of the folder into one season archive, the json files are only removed once it reads back
+        archive_path = os.path.join(self.directory, f"{archive_name}{ARCHIVE_EXTENSION}")
+        if os.path.exists(archive_path):
+            raise FileExistsError(f"Season archive '{archive_path}' already exists")
+        match_files = [filename for filename in os.listdir(self.directory) if filename.endswith('_match.json')]
+        match_count, event_count = write_archive(archive_path, self.directory, match_files)
+        archive = SeasonArchive(archive_path)
+        if sorted(archive.match_files()) != sorted(match_files):
+            raise ValueError(f"Season archive '{archive_path}' doesn't hold every match file")
+        if remove_files:
+            for filename in match_files:
+                events_file = archive.match_data(filename)['eventsLogFile']
+                os.remove(os.path.join(self.directory, filename))
+                os.remove(os.path.join(self.directory, events_file))
+        print(f"Archived {match_count} matches and {event_count} events into '{archive_path}'.")
+
+
+if __name__ == "__main__":
+    # Example usage:
+    directory = "MatchLog"
+    json_manager = JsonFileManager(directory)
+    json_manager.sort_and_assign_match_ids()
\ No newline at end of file
@@ -1,38 +1,149 @@
 import pandas as pd
+import numpy as np
 from player_in_match import PlayerInMatch
 from match_class import Match
-from rapidfuzz import process
+from rank_index import RankIndex
+from mmr_history import MMRHistory
+from mmr_series import mmr_series
+from storage import storage_for
+from fuzzy_index import FuzzyNameIndex
 from rapidfuzz import fuzz
 import ast
 import difflib
+import os
+import time
+
+
+def normalize_name(player_name):
+    return str(player_name).lower().replace(" ","")
+
+
+MATCH_COLUMNS = ['MMR', 'Crewmate MMR', 'Impostor MMR', 'Voting Accuracy (Crewmate games)',
+                 'Total Number Of Games Played', 'Number Of Impostor Games Played', 'Number Of Crewmate Games Played',
+                 'Number Of Impostor Games Won', 'Number Of Crewmate Games Won', 'Number Of Games Won',
+                 'Number Of Games Died First', 'Threw on Crit', 'Voted Right on Crit but Lost']
+HISTORY_COLUMN = 'MMR History Records'
+
+
+def apply_match_deltas(values, players):
+    # same arithmetic as update_player/update_crewmate_stats/update_impostor_stats, one array slot per player
+    sign = np.array([-1 if player.canceled else 1 for player in players])
+    won = np.array([bool(player.won) for player in players])
+    crewmate = np.array([player.team == "crewmate" for player in players])
+    impostor = ~crewmate
+    died_first = np.array([bool(player.died_first_round) for player in players])
+    voted = crewmate & ~died_first
+    threw = voted & np.array([bool(player.voted_wrong_on_crit) for player in players])
+    voted_right = voted & np.array([bool(player.right_vote_on_crit_but_loss) for player in players])
+    mmr_changes = np.array([player.mmr_gain for player in players]) * sign
+    crew_changes = np.array([player.crewmate_mmr_gain for player in players]) * sign
+    imp_changes = np.array([player.impostor_mmr_gain for player in players]) * sign
+
+    values['MMR'] = np.round(values['MMR'] + mmr_changes, 3)
+    values['Crewmate MMR'] = np.round(values['Crewmate MMR'] + crew_changes, 3)
+    values['Impostor MMR'] = np.round(values['Impostor MMR'] + imp_changes, 3)
+    values['Total Number Of Games Played'] += sign
+    values['Number Of Games Won'] += sign * won
+    values['Number Of Crewmate Games Played'] += sign * crewmate
+    values['Number Of Crewmate Games Won'] += sign * (crewmate & won)
+    values['Number Of Impostor Games Played'] += sign * impostor
+    values['Number Of Impostor Games Won'] += sign * (impostor & won)
+    values['Number Of Games Died First'] += sign * (crewmate & died_first)
+    values['Threw on Crit'] += sign * threw
+    values['Voted Right on Crit but Lost'] += sign * voted_right
+
+    voting_acc = values['Voting Accuracy (Crewmate games)']
+    games_counted = values['Number Of Crewmate Games Played'] - values['Number Of Games Died First']
+    match_voting_acc = np.array([player.get_voting_accuracy() for player in players])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        new_voting_acc = np.round(((voting_acc * (games_counted - 1)) + match_voting_acc) / games_counted, 4)
+    values['Voting Accuracy (Crewmate games)'] = np.where(voted, new_voting_acc, voting_acc)
+    return list(zip(mmr_changes.tolist(), crew_changes.tolist(), imp_changes.tolist()))
+
 
 class Leaderboard:
-    def __init__(self, csv_file):
-        self.csv_file = csv_file
+    def __init__(self, database_location, write_behind=False, flush_interval=30, storage=None, history=None):
+        self.database_location = database_location
+        self.storage = storage if storage is not None else storage_for(database_location)
+        self.write_behind = write_behind # coalesce saves, flush() at most once per flush_interval seconds
+        self.flush_interval = flush_interval
+        self.dirty = False
+        self.changed_ids = set() # player ids written on the next flush, None for every row
+        self.last_flush = time.monotonic()
+        self.name_index = {}
+        self.discord_index = {}
+        self.fuzzy_index = FuzzyNameIndex()
+        self.ranking = RankIndex()
+        self.next_player_id = 0
+        self.version = 0 # bumped on every change, cached views are only valid for the version they were built at
+        self.views = {}
+        self.views_version = None
+        self.history_generation = 0 # bumped when recorded history is rewritten instead of appended to
+        self.history = history if history is not None else MMRHistory(f"{os.path.splitext(database_location)[0]}_history")
         self.load_leaderboard()
 
 
     def load_leaderboard(self):
-        try:
-            self.leaderboard = pd.read_csv(self.csv_file)
-            self.leaderboard.set_index('Rank', inplace=True)
-            self.leaderboard = self.leaderboard.fillna(0)
-            self.leaderboard = self.leaderboard.astype({'Player Discord': int,
-                                                        'MMR': float, 
-                                                        'Crewmate MMR': float, 
-                                                        'Impostor MMR': float,
-                                                        'Voting Accuracy (Crewmate games)': float,
-                                                        })
-            self.leaderboard['Change In MMR'] = self.leaderboard['Change In MMR'].apply(ast.literal_eval)
-            self.leaderboard['Change In Crewmate MMR'] = self.leaderboard['Change In Crewmate MMR'].apply(ast.literal_eval)
-            self.leaderboard['Change In Impostor MMR'] = self.leaderboard['Change In Impostor MMR'].apply(ast.literal_eval)
-        except FileNotFoundError:
+        leaderboard = self.storage.load()
+        if leaderboard is not None:
+            leaderboard = leaderboard.fillna(0)
+            leaderboard = leaderboard.astype({'Player Discord': int,
+                                              'MMR': float, 
+                                              'Crewmate MMR': float, 
+                                              'Impostor MMR': float,
+                                              'Voting Accuracy (Crewmate games)': float,
+                                              })
+            if HISTORY_COLUMN in leaderboard.columns:
+                leaderboard = leaderboard.astype({HISTORY_COLUMN: int})
+                self.history.recover(dict(zip(leaderboard.index, leaderboard[HISTORY_COLUMN])))
+        elif self.history.is_empty():
             self.create_empty_leaderboard()
+        else: # player ids would restart from 0 and pick up the history of whoever had them before
+            raise RuntimeError(f"No leaderboard at {self.database_location} but MMR history exists, restore the leaderboard or remove the history")
+        self.build_indexes(leaderboard)
+        if 'Change In MMR' in self.leaderboard.columns:
+            self.migrate_history_columns()
+
+
+    def migrate_history_columns(self):
+        # files written before the history store kept the MMR changes as list reprs in the CSV
+        for index, row in self.leaderboard.iterrows():
+            if self.history.length(index) == 0:
+                self.history.extend(index,
+                                    ast.literal_eval(row['Change In MMR']),
+                                    ast.literal_eval(row['Change In Crewmate MMR']),
+                                    ast.literal_eval(row['Change In Impostor MMR']))
+        self.leaderboard.drop(columns=['Change In MMR', 'Change In Crewmate MMR', 'Change In Impostor MMR'], inplace=True)
+        self.dirty = True
+        self.changed_ids = None
+        self.flush()
+
+
+    def build_indexes(self, leaderboard=None):
+        # normalized name / discord id -> player id, first row in file (rank) order wins like the old column scans
+        # built aside and published with the leaderboard in one assignment, so readers on the event loop
+        # never see a half built index or indexes of another leaderboard
+        if leaderboard is None:
+            leaderboard = self.leaderboard
+        name_index = {}
+        discord_index = {}
+        fuzzy_index = FuzzyNameIndex()
+        for index, player_name, discord_id in zip(leaderboard.index, leaderboard['Player Name'], leaderboard['Player Discord']):
+            name_index.setdefault(normalize_name(player_name), index)
+            fuzzy_index.add(normalize_name(player_name), index)
+            if discord_id:
+                discord_index.setdefault(int(discord_id), index)
+        next_player_id = int(leaderboard.index.max()) + 1 if not leaderboard.empty else 0
+        ranking = RankIndex()
+        ranking.rebuild(leaderboard['MMR'].items())
+        self.leaderboard, self.name_index, self.discord_index, self.fuzzy_index, self.next_player_id, self.ranking = (
+            leaderboard, name_index, discord_index, fuzzy_index, next_player_id, ranking)
+        self.version += 1
 
 
     def create_empty_leaderboard(self):
         columns = [
-            'Rank',
+            'Player ID',
             'Player Name', 
             'Player Discord', 
             'MMR', 
@@ -47,31 +158,114 @@ class Leaderboard:
             'Number Of Games Won',
             'Number Of Games Died First',
             'Threw on Crit', 
-            'Voted Right on Crit but Lost',
-            'Change In MMR',
-            'Change In Crewmate MMR', 
-            'Change In Impostor MMR'
+            'Voted Right on Crit but Lost'
             # , 
             # 'Previous Games Voting Accuracy', 'Change In Crewmate MMR', 'Change In Impostor MMR',
             # 'Crewmate Win Streak', 'Best Crewmate Win Streak',
             # 'Impostor Win Streak', 'Best Impostor Win Streak'
         ]
         self.leaderboard = pd.DataFrame(columns=columns)
-        self.leaderboard.set_index('Rank', inplace=True)
+        self.leaderboard.set_index('Player ID', inplace=True)
+        self.history_generation += 1
+
+
+    def replace_with(self, other, history_lengths=None):
+        # adopt a leaderboard rebuilt elsewhere, discord links are kept for names that are still on it
+        # and players missing from it (i.e. linked without a game) are carried over under new ids
+        # history_lengths: the other leaderboard started from a checkpoint and only holds the history after it
+        discords = {normalize_name(player_name): discord_id for player_name, discord_id
+                    in zip(self.leaderboard['Player Name'], self.leaderboard['Player Discord']) if discord_id}
+        rebuilt_names = {normalize_name(player_name) for player_name in other.leaderboard['Player Name']}
+        missing = self.leaderboard[[normalize_name(player_name) not in rebuilt_names for player_name in self.leaderboard['Player Name']]]
+        if missing.empty:
+            leaderboard = other.leaderboard.copy()
+        else:
+            first_id = int(other.leaderboard.index.max()) + 1 if not other.leaderboard.empty else 0
+            missing = missing.set_axis(pd.RangeIndex(first_id, first_id + len(missing), name='Player ID'))
+            leaderboard = pd.concat([other.leaderboard, missing]) if not other.leaderboard.empty else missing.copy()
+        leaderboard['Player Discord'] = [discords.get(normalize_name(player_name), discord_id) for player_name, discord_id
+                                         in zip(leaderboard['Player Name'], leaderboard['Player Discord'])]
+        if history_lengths is None:
+            other.history.write_to(self.history)
+        else:
+            self.history.truncate(history_lengths)
+            other.history.append_to(self.history)
+        self.build_indexes(leaderboard)
+        self.history_generation += 1
+        self.changed_ids = None
+        self.dirty = True
+        self.flush()
+
+
+    def manual_offsets(self, checkpoint=None):
+        # MMR the history doesn't explain since the checkpoint (or season start), i.e. !mmr_change edits
+        lengths = {} if checkpoint is None else checkpoint['history_lengths']
+        base = None if checkpoint is None else checkpoint['leaderboard']
+        offsets = {}
+        for index, player_name, mmr, crew_mmr, imp_mmr in zip(self.leaderboard.index, self.leaderboard['Player Name'], self.leaderboard['MMR'],
+                                                              self.leaderboard['Crewmate MMR'], self.leaderboard['Impostor MMR']):
+            if base is not None and index in base.index:
+                start = base.at[index, 'MMR'], base.at[index, 'Crewmate MMR'], base.at[index, 'Impostor MMR']
+            else:
+                start = 1000.0, 1000.0, 1000.0
+            history = self.history.read(index)[lengths.get(int(index), 0):]
+            offset = (round(mmr - start[0] - history['mmr'].sum(), 3),
+                      round(crew_mmr - start[1] - history['crew'].sum(), 3),
+                      round(imp_mmr - start[2] - history['imp'].sum(), 3))
+            if any(offset):
+                offsets[normalize_name(player_name)] = offset
+        return offsets
+
+
+    def apply_offsets(self, offsets):
+        for player_name, (mmr, crew_mmr, imp_mmr) in offsets.items():
+            index = self.name_index.get(player_name)
+            if index is None:
+                continue
+            self.leaderboard.at[index, 'MMR'] = round(self.leaderboard.at[index, 'MMR'] + mmr, 3)
+            self.leaderboard.at[index, 'Crewmate MMR'] = round(self.leaderboard.at[index, 'Crewmate MMR'] + crew_mmr, 3)
+            self.leaderboard.at[index, 'Impostor MMR'] = round(self.leaderboard.at[index, 'Impostor MMR'] + imp_mmr, 3)
+            self.ranking.update(index, self.leaderboard.at[index, 'MMR'])
+            self.mark_changed(index)
 
 
     def save_leaderboard(self):
-        self.leaderboard.to_csv(self.csv_file, float_format='%.3f')
+        self.dirty = True
+        if not self.write_behind or time.monotonic() - self.last_flush >= self.flush_interval:
+            self.flush()
+
+
+    def flush(self):
+        if not self.dirty:
+            return
+        self.history.write_pending() # before the rows that count those games
+        # the rows carry how many history records they count, load_leaderboard cuts off whatever was written past that
+        if self.changed_ids is None or HISTORY_COLUMN not in self.leaderboard.columns:
+            self.leaderboard[HISTORY_COLUMN] = np.array([self.history.length(player_id) for player_id in self.leaderboard.index], dtype=np.int64)
+            self.changed_ids = None
+        elif self.changed_ids:
+            player_ids = sorted(self.changed_ids)
+            self.leaderboard.loc[player_ids, HISTORY_COLUMN] = [self.history.length(player_id) for player_id in player_ids]
+        self.storage.save(self.leaderboard, self.ranking.ids(), self.changed_ids)
+        self.changed_ids = set()
+        self.dirty = False
+        self.last_flush = time.monotonic()
+
+
+    def mark_changed(self, player_id):
+        self.version += 1
+        if self.changed_ids is not None:
+            self.changed_ids.add(player_id)
 
 
     def new_player(self, player_name):
         new_player_data = {
             'Player Name': player_name,
             'Player Discord': 0,
-            'MMR': 1000,
-            'Crewmate MMR': 1000,
-            'Impostor MMR': 1000,
-            'Voting Accuracy (Crewmate games)': 1,
+            'MMR': 1000.0,
+            'Crewmate MMR': 1000.0,
+            'Impostor MMR': 1000.0,
+            'Voting Accuracy (Crewmate games)': 1.0,
             'Total Number Of Games Played': 0,
             'Number Of Impostor Games Played': 0,
             'Number Of Crewmate Games Played': 0,
@@ -80,10 +274,7 @@ class Leaderboard:
             'Number Of Games Won': 0,
             'Number Of Games Died First': 0,
             'Threw on Crit': 0, 
-            'Voted Right on Crit but Lost': 0,
-            'Change In MMR':[],
-            'Change In Crewmate MMR':[], 
-            'Change In Impostor MMR':[]
+            'Voted Right on Crit but Lost': 0
             #,
             # 'Best Crewmate Win Streak': 0,
             # 'Impostor Win Streak': 0,
@@ -92,14 +283,22 @@ class Leaderboard:
             # 'Change In Crewmate MMR': pd.DataFrame([], columns=['Change In Crewmate MMR']),
             # 'Change In Impostor MMR': pd.DataFrame([], columns=['Change In Impostor MMR'])
         }
-        self.leaderboard = pd.concat([self.leaderboard, pd.DataFrame([new_player_data])], ignore_index=True)
-        self.rank_players()
+        if HISTORY_COLUMN in self.leaderboard.columns:
+            new_player_data[HISTORY_COLUMN] = 0 # keeps the column integer, flush() sets the count
+        player_id = self.next_player_id
+        self.next_player_id += 1
+        new_row = pd.DataFrame([new_player_data], index=pd.Index([player_id], name='Player ID'))
+        self.leaderboard = pd.concat([self.leaderboard, new_row]) if not self.leaderboard.empty else new_row
+        self.name_index.setdefault(normalize_name(player_name), player_id)
+        self.fuzzy_index.add(normalize_name(player_name), player_id)
+        self.ranking.add(player_id, new_player_data['MMR'])
+        self.mark_changed(player_id)
         self.save_leaderboard()
 
 
     def update_player(self, player: PlayerInMatch):
         player_row = self.get_player_row(player.name)
-        index = player_row['Rank']
+        index = player_row['Player ID']
         if player.canceled:
             self.leaderboard.at[index, 'MMR'] -= player.mmr_gain
             self.leaderboard.at[index, 'MMR'] = round(self.leaderboard.at[index, 'MMR'],3)
@@ -107,9 +306,7 @@ class Leaderboard:
             self.leaderboard.at[index, 'Crewmate MMR'] = round(self.leaderboard.at[index, 'Crewmate MMR'], 3)
             self.leaderboard.at[index, 'Impostor MMR'] -= player.impostor_mmr_gain
             self.leaderboard.at[index, 'Impostor MMR'] = round(self.leaderboard.at[index, 'Impostor MMR'], 3)
-            self.leaderboard.at[index, 'Change In MMR'].append(player.mmr_gain*-1)
-            self.leaderboard.at[index, 'Change In Crewmate MMR'].append(player.crewmate_mmr_gain*-1)
-            self.leaderboard.at[index, 'Change In Impostor MMR'].append(player.impostor_mmr_gain*-1)
+            self.history.append(index, player.mmr_gain*-1, player.crewmate_mmr_gain*-1, player.impostor_mmr_gain*-1)
             self.leaderboard.at[index, 'Total Number Of Games Played'] -= 1
             if player.won: self.leaderboard.at[index, 'Number Of Games Won'] -= 1
 
@@ -121,9 +318,7 @@ class Leaderboard:
             self.leaderboard.at[index, 'Impostor MMR'] += player.impostor_mmr_gain
             self.leaderboard.at[index, 'Impostor MMR'] = round(self.leaderboard.at[index, 'Impostor MMR'], 3)
             self.leaderboard.at[index, 'Total Number Of Games Played'] += 1
-            self.leaderboard.at[index, 'Change In MMR'].append(player.mmr_gain)
-            self.leaderboard.at[index, 'Change In Crewmate MMR'].append(player.crewmate_mmr_gain)
-            self.leaderboard.at[index, 'Change In Impostor MMR'].append(player.impostor_mmr_gain)
+            self.history.append(index, player.mmr_gain, player.crewmate_mmr_gain, player.impostor_mmr_gain)
             if player.won: self.leaderboard.at[index, 'Number Of Games Won'] += 1
             
         if player.team == "crewmate":
@@ -131,14 +326,32 @@ class Leaderboard:
         else:
             self.update_impostor_stats(index, player)
 
-        self.rank_players()
-        self.save_leaderboard()
+        self.ranking.update(index, self.leaderboard.at[index, 'MMR'])
+        self.mark_changed(index)
         
 
-    def rank_players(self):
-        self.leaderboard = self.leaderboard.sort_values(by='MMR', ascending=False)
-        self.leaderboard.reset_index(drop=True, inplace=True)
-        self.leaderboard.index.name = 'Rank'
+    def apply_match(self, match : Match):
+        players = match.players.players
+        player_ids = [player.leaderboard_id if player.leaderboard_id is not None else self.name_index.get(normalize_name(player.name))
+                      for player in players]
+        if None in player_ids or len(set(player_ids)) != len(player_ids):
+            # unknown or repeated names can't go through one vectorized update
+            for player in players:
+                self.update_player(player)
+            self.save_leaderboard()
+            return
+
+        # every new value is computed before the DataFrame is touched, so a failure leaves the whole lobby unchanged
+        rows = self.leaderboard.loc[player_ids, MATCH_COLUMNS]
+        values = {column: rows[column].to_numpy(copy=True) for column in MATCH_COLUMNS}
+        history_changes = apply_match_deltas(values, players)
+        self.leaderboard.loc[player_ids, MATCH_COLUMNS] = pd.DataFrame(values, index=player_ids)
+
+        for player_id, (mmr_change, crew_change, imp_change) in zip(player_ids, history_changes):
+            self.history.append(player_id, mmr_change, crew_change, imp_change)
+            self.ranking.update(player_id, self.leaderboard.at[player_id, 'MMR'])
+            self.mark_changed(player_id)
+        self.save_leaderboard()
 
 
     def update_crewmate_stats(self, index, player : PlayerInMatch):
@@ -190,37 +403,53 @@ class Leaderboard:
 
 
     def get_player_row(self, player_name):
-        lowercase_name = str(player_name).lower().replace(" ","")
-        row = self.leaderboard[self.leaderboard['Player Name'].str.lower().str.replace(" ","") == lowercase_name]
-        if not row.empty:
-            row.reset_index(inplace=True, drop=False)
-            return row.iloc[0]
+        index = self.name_index.get(normalize_name(player_name))
+        if index is not None:
+            return self.get_row_by_index(index)
         else:
             return None
+
+
+    def get_player_info(self, player_name):
+        # player id, MMR, crewmate MMR, impostor MMR and discord, what rating a match reads
+        player_row = self.get_player_row(player_name)
+        return (player_row['Player ID'], self.get_player_mmr(player_row), self.get_player_crew_mmr(player_row),
+                self.get_player_imp_mmr(player_row), self.get_player_discord(player_row))
+
+
+    def get_row_by_index(self, index):
+        # built in one go, enlarging a Series key by key is slower than the lookup itself
+        row = self.leaderboard.loc[index]
+        return pd.Series([*row.tolist(), index, self.ranking.rank(index)],
+                         index=[*row.index, 'Player ID', 'Rank'], name=row.name, dtype=object)
         
 
     def get_player_row_lookslike(self, player_name):
-        row = self.leaderboard[self.leaderboard['Player Name'] == player_name]
-
-        if row.empty: 
-            self.leaderboard['player_name_normalized'] = self.leaderboard['Player Name'].apply(lambda x: x.strip().lower().replace(" ",""))
-            best_match = process.extractOne(player_name.strip().lower().replace(" ",""), self.leaderboard['player_name_normalized'], score_cutoff=85)
-            if best_match is not None:
-                best_player_name_match, score, any = best_match
-                if score >= 85:  # Adjust the threshold as needed
-                    row = self.leaderboard[self.leaderboard['player_name_normalized'] == best_player_name_match]
-
-            # Check if the column exists before attempting to drop it
-            if 'player_name_normalized' in self.leaderboard.columns:
-                self.leaderboard.drop(columns=['player_name_normalized'], inplace=True)
-
-        if not row.empty:
-            row.reset_index(inplace=True, drop=False)
-            return row.iloc[0]
+        player_row = self.get_player_row(player_name)
+        if player_row is not None:
+            return player_row
+
+        best_match = self.fuzzy_index.search(normalize_name(player_name.strip()), score_cutoff=85)
+        if best_match is not None:
+            index, score = best_match
+            return self.get_row_by_index(index)
         else:
             return None
 
         
+    def get_mmr_history(self, player_row):
+        return self.history.read(player_row['Player ID'])
+
+
+    def get_mmr_history_length(self, player_row):
+        return self.history.length(player_row['Player ID'])
+
+
+    def get_mmr_series(self, player_row, points=None, first_game=None, last_game=None):
+        # cumulative MMR, crewmate MMR and impostor MMR as (game numbers, values), game 0 is the starting 1000
+        return mmr_series(self.get_mmr_history(player_row), points, first_game, last_game)
+
+
     def get_player_ranking(self, player_row):
         if not player_row.empty:
             ranking = player_row['Rank'] + 1
@@ -258,11 +487,7 @@ class Leaderboard:
 
 
     def is_player_in_leaderboard(self, player_name):
-        player_row = self.get_player_row(player_name)
-        if player_row is not None and not player_row.empty:
-            return not player_row.empty
-        else:
-            return False
+        return normalize_name(player_name) in self.name_index
     
 
     def get_player_crew_win_rate(self, player_row):
@@ -310,10 +535,9 @@ class Leaderboard:
     
 
     def get_player_by_discord(self, discord_id):
-        row = self.leaderboard[self.leaderboard['Player Discord'] == int(discord_id)]
-        if not row.empty:
-            row.reset_index(inplace=True, drop=False)
-            return row.iloc[0]
+        index = self.discord_index.get(int(discord_id))
+        if index is not None:
+            return self.get_row_by_index(index)
         else:
             return None
 
@@ -321,25 +545,53 @@ class Leaderboard:
     def add_player_discord(self, player_name, discord_id):
         player_row = self.get_player_row(player_name)
         if player_row is not None and not player_row.empty:
-            index = player_row['Rank']
+            index = player_row['Player ID']
+            self.remove_from_discord_index(player_row)
             self.leaderboard.at[index, 'Player Discord'] = int(discord_id)
+            if int(discord_id):
+                self.discord_index[int(discord_id)] = index
+            self.mark_changed(index)
             self.save_leaderboard()
             return True
         else:
             return False
 
 
+    def remove_from_discord_index(self, player_row):
+        discord_id = int(player_row['Player Discord'])
+        if discord_id and self.discord_index.get(discord_id) == player_row['Player ID']:
+            del self.discord_index[discord_id]
+
+
     def delete_player_discord(self, player_name):
         player_row = self.get_player_row(player_name)
         if player_row is not None and not player_row.empty:
-            index = player_row['Rank'] 
+            index = player_row['Player ID']
+            self.remove_from_discord_index(player_row)
             self.leaderboard.at[index, 'Player Discord'] = 0
+            self.mark_changed(index)
             self.save_leaderboard()
             return True
         else:
             return False
     
 
+    def change_player_name(self, old_name, new_name):
+        player_row = self.get_player_row(old_name)
+        if player_row is not None:
+            index = player_row['Player ID']
+            self.leaderboard.at[index, 'Player Name'] = new_name
+            self.name_index.pop(normalize_name(old_name), None)
+            self.name_index.setdefault(normalize_name(new_name), index)
+            self.fuzzy_index.remove(normalize_name(player_row['Player Name']), index)
+            self.fuzzy_index.add(normalize_name(new_name), index)
+            self.mark_changed(index)
+            self.save_leaderboard()
+            return True
+        else:
+            return False
+
+
     def players_with_empty_discord(self):
         players_with_empty_discord = self.leaderboard[self.leaderboard['Player Discord'] == 0]
         if not players_with_empty_discord.empty:
@@ -348,53 +600,73 @@ class Leaderboard:
             return None
 
 
+    def top_players_view(self, column, top):
+        if self.views_version != self.version:
+            self.views = {}
+            self.views_version = self.version
+        view = self.views.get((column, top))
+        if view is None:
+            if column == 'MMR':
+                player_ids = self.ranking.top(top)
+            else:
+                player_ids = self.leaderboard[column].nlargest(top).index
+            view = self.leaderboard.loc[player_ids, ['Player Name', column]]
+            view.reset_index(drop=True, inplace=True)
+            view.index.name = 'Rank'
+            self.views[(column, top)] = view
+        return view
+
+
+    def title_holder(self, column):
+        top_player = self.top_players_view(column, 1)
+        if top_player.empty:
+            return None
+        return top_player.iat[0, 0]
+
+
     def top_players_by_mmr(self, top=10):
         if top == "": top = 10
-        top_players = self.leaderboard.nlargest(top, 'MMR')[['Player Name', 'MMR']]
-        return top_players
+        return self.top_players_view('MMR', top)
+
+
+    def players_around(self, player_row, span=2):
+        player_ids = self.ranking.around(player_row['Player ID'], span)
+        players_around = self.leaderboard.loc[player_ids, ['Player Name', 'MMR']]
+        first_rank = max(player_row['Rank'] - span, 0)
+        players_around.index = pd.RangeIndex(first_rank, first_rank + len(player_ids), name='Rank')
+        return players_around
 
 
     def top_players_by_impostor_mmr(self, top=10):
         if top == "": top = 10
-        top_impostors = self.leaderboard.nlargest(top, 'Impostor MMR')[['Player Name', 'Impostor MMR']]
-        top_impostors.columns = ['Player Name', 'Impostor MMR']
-        top_impostors.reset_index(drop=True, inplace=True)
-        top_impostors.index.name = 'Rank'
-        return top_impostors
+        return self.top_players_view('Impostor MMR', top)
 
 
     def top_players_by_crewmate_mmr(self, top=10):
         if top == "":
             top = 10
-        top_crewmates = self.leaderboard.nlargest(top, 'Crewmate MMR')[['Player Name', 'Crewmate MMR']]
-        top_crewmates.columns = ['Player Name', 'Crewmate MMR']
-        top_crewmates.reset_index(drop=True, inplace=True)
-        top_crewmates.index.name = 'Rank'
-        return top_crewmates
+        return self.top_players_view('Crewmate MMR', top)
     
 
     def is_player_sherlock(self, player_name):
-        best_crewmate = self.leaderboard[['Player Name', 'Crewmate MMR']].sort_values(by='Crewmate MMR', ascending=False).head(1)
-        crewmate_name = best_crewmate.iloc[0]['Player Name']
-        if fuzz.ratio(player_name.lower().strip(), crewmate_name.lower().strip()) >= 85:
+        crewmate_name = self.title_holder('Crewmate MMR')
+        if crewmate_name is not None and fuzz.ratio(player_name.lower().strip(), crewmate_name.lower().strip()) >= 85:
             return True
         else:
             return False
     
 
     def is_player_jack_the_ripper(self, player_name):
-        best_impostor = self.leaderboard[['Player Name', 'Impostor MMR']].sort_values(by='Impostor MMR', ascending=False).head(1)
-        impostor_name = best_impostor.iloc[0]['Player Name']
-        if fuzz.ratio(player_name.lower().strip(), impostor_name.lower().strip()) >= 85:
+        impostor_name = self.title_holder('Impostor MMR')
+        if impostor_name is not None and fuzz.ratio(player_name.lower().strip(), impostor_name.lower().strip()) >= 85:
             return True
         else:
             return False
         
 
     def is_player_ace(self, player_name):
-        best_overall = self.leaderboard[['Player Name', 'MMR']].head(1)
-        player = best_overall.iloc[0]['Player Name']
-        if fuzz.ratio(player_name.lower().strip(), player.lower().strip()) >= 85:
+        player = self.title_holder('MMR')
+        if player is not None and fuzz.ratio(player_name.lower().strip(), player.lower().strip()) >= 85:
             return True
         else:
             return False
@@ -402,30 +674,36 @@ class Leaderboard:
     
     def mmr_change(self, player_row, value):
         value = float(value)
-        index = player_row['Rank']
+        index = player_row['Player ID']
         self.leaderboard.at[index, 'Crewmate MMR'] += value
         self.leaderboard.at[index, 'Crewmate MMR'] = round(self.leaderboard.at[index, 'Crewmate MMR'], 3)
         self.leaderboard.at[index, 'Impostor MMR'] += value
         self.leaderboard.at[index, 'Impostor MMR'] = round(self.leaderboard.at[index, 'Impostor MMR'], 3)
         self.leaderboard.at[index, 'MMR'] = round((self.leaderboard.at[index, 'Crewmate MMR']+self.leaderboard.at[index, 'Impostor MMR'])/2,3)
+        self.ranking.update(index, self.leaderboard.at[index, 'MMR'])
+        self.mark_changed(index)
         self.save_leaderboard()
 
 
     def mmr_change_crew(self, player_row, value):
         value = float(value)
-        index = player_row['Rank']
+        index = player_row['Player ID']
         self.leaderboard.at[index, 'Crewmate MMR'] += value
         self.leaderboard.at[index, 'Crewmate MMR'] = round(self.leaderboard.at[index, 'Crewmate MMR'], 3)
         self.leaderboard.at[index, 'MMR'] = round((self.leaderboard.at[index, 'Crewmate MMR']+self.leaderboard.at[index, 'Impostor MMR'])/2,3)
+        self.ranking.update(index, self.leaderboard.at[index, 'MMR'])
+        self.mark_changed(index)
         self.save_leaderboard()
 
 
     def mmr_change_imp(self, player_row, value):
         value = float(value)
-        index = player_row['Rank']
+        index = player_row['Player ID']
         self.leaderboard.at[index, 'Impostor MMR'] += value
         self.leaderboard.at[index, 'Impostor MMR'] = round(self.leaderboard.at[index, 'Impostor MMR'], 3)
         self.leaderboard.at[index, 'MMR'] = round((self.leaderboard.at[index, 'Crewmate MMR']+self.leaderboard.at[index, 'Impostor MMR'])/2,3)
+        self.ranking.update(index, self.leaderboard.at[index, 'MMR'])
+        self.mark_changed(index)
         self.save_leaderboard()
 
     # Add other methods as needed
@@ -0,0 +1,133 @@
+import json
+import time
+import calendar
+from enum import IntEnum
+from typing import NamedTuple
+
+TIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+NO_NAME = -1
+NO_TIME = -2**63 # an event time that couldn't be decoded, in fixed-width tables
+
+class EventType(IntEnum):
+    UNKNOWN = 0
+    TASK = 1
+    PLAYER_VOTE = 2
+    DEATH = 3
+    BODY_REPORT = 4
+    MEETING_START = 5
+    EXILED = 6
+    MEETING_END = 7
+    GAME_CANCEL = 8
+    MANUAL_GAME_END = 9
+    DISCONNECT = 10
+
+
+EVENT_TYPES = {"Task": EventType.TASK, "PlayerVote": EventType.PLAYER_VOTE, "Death": EventType.DEATH,
+               "BodyReport": EventType.BODY_REPORT, "MeetingStart": EventType.MEETING_START, "Exiled": EventType.EXILED,
+               "MeetingEnd": EventType.MEETING_END, "GameCancel": EventType.GAME_CANCEL,
+               "ManualGameEnd": EventType.MANUAL_GAME_END, "Disconnect": EventType.DISCONNECT}
+
+
+class EventRecord(NamedTuple):
+    # name fields are ids into EventLogDecoder.names, NO_NAME when the event doesn't have the key
+    type: EventType
+    time: int
+    name: int
+    player: int
+    target: int
+    killer: int
+    dead_player: int
+    result: str
+
+
+def decode_time(text):
+    # "MM/DD/YYYY HH:MM:SS" -> seconds, sliced by hand since strptime dominates decoding
+    try:
+        return calendar.timegm((int(text[6:10]), int(text[0:2]), int(text[3:5]),
+                                int(text[11:13]), int(text[14:16]), int(text[17:19])))
+    except (TypeError, ValueError):
+        return None
+
+
+def format_time(seconds):
+    if seconds is None:
+        return None
+    return time.strftime(TIME_FORMAT, time.gmtime(seconds))
+
+
+def iter_json_array(text):
+    # yields the elements of a top level json array one at a time, so readers can stop before the end
+    decoder = json.JSONDecoder()
+    position = text.index('[') + 1
+    length = len(text)
+    while True:
+        while position < length and text[position] in ' \t\r\n,':
+            position += 1
+        if position >= length or text[position] == ']':
+            return
+        element, position = decoder.raw_decode(text, position)
+        yield element
+
+
+def read_match_file(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+class EventLogDecoder:
+    def __init__(self, aliases=None, started=None):
+        # with aliases, names from before a rename are interned as the player's current name
+        self.names = []
+        self.name_ids = {}
+        self.aliases = aliases
+        self.started = started
+
+
+    def intern(self, name):
+        if name is None:
+            return NO_NAME
+        name_id = self.name_ids.get(name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.name_ids[name] = name_id
+            self.names.append(name if self.aliases is None else self.aliases.resolve(name, self.started))
+        return name_id
+
+
+    def name(self, name_id):
+        return None if name_id == NO_NAME else self.names[name_id]
+
+
+    def decode(self, event):
+        intern = self.intern
+        return EventRecord(EVENT_TYPES.get(event.get('Event'), EventType.UNKNOWN), decode_time(event.get('Time')),
+                           intern(event.get('Name')), intern(event.get('Player')), intern(event.get('Target')),
+                           intern(event.get('Killer')), intern(event.get('DeadPlayer')), event.get('Result'))
+
+
+    def iter_text(self, text):
+        for event in iter_json_array(text):
+            yield self.decode(event)
+
+
+    def iter_file(self, path):
+        # the file is read here, events are only decoded as the caller iterates
+        with open(path, 'r') as file:
+            return self.iter_text(file.read())
+
+
+    def iter_records(self, records, string):
+        # events of a season archive, the name columns there are ids into the archive's string table
+        name_ids = {}
+        def intern(string_id):
+            name_id = name_ids.get(string_id)
+            if name_id is None:
+                name_id = name_ids[string_id] = self.intern(string(string_id))
+            return name_id
+        for event_type, event_time, name, player, target, killer, dead_player, result in records.tolist():
+            yield EventRecord(EventType(event_type), None if event_time == NO_TIME else event_time, intern(name), intern(player),
+                              intern(target), intern(killer), intern(dead_player), string(result))
+
+
+    def read_file(self, path):
+        return list(self.iter_file(path))
@@ -0,0 +1,158 @@
+import os
+import json
+from bisect import bisect_left, insort
+from datetime import datetime
+
+class MatchIndex:
+    def __init__(self, matches_path, manifest_file="match_index.jsonl", archives=None):
+        # match file name -> MatchID, events file, gameStarted, result and the (mtime, size) they were read at,
+        # for archived matches the (mtime, size) of the season archive they're in.
+        # The manifest is append-only: a line with the season folder, then one line per entry read or removed, compacted on load
+        self.matches_path = matches_path
+        self.manifest_file = manifest_file
+        self.archives = archives
+        self.entries = {}
+        self.file_by_id = {}
+        self.order = [] # sorted (started, file name), started is an ISO timestamp so it sorts as a string
+        self.unsaved = {} # file name -> entry, None once removed, appended by save()
+        self.load()
+
+
+    def load(self):
+        try:
+            with open(self.manifest_file, 'r') as file:
+                lines = file.read().split('\n')
+        except FileNotFoundError:
+            lines = ['']
+        try:
+            header = json.loads(lines[0]) if lines[0] else {}
+        except json.JSONDecodeError:
+            header = {}
+        if header.get('matches_path') == self.matches_path: # otherwise the manifest of another season
+            for line in lines[1:-1]: # the last piece is empty, or an append cut off by a crash
+                entry = json.loads(line)
+                if entry.get('removed'):
+                    self.entries.pop(entry['file'], None)
+                else:
+                    self.entries[entry.pop('file')] = entry
+        self.file_by_id = {str(entry['MatchID']): file_name for file_name, entry in self.entries.items()}
+        self.order = sorted((entry['started'], file_name) for file_name, entry in self.entries.items() if entry['started'])
+        if len(lines) != len(self.entries) + 2 or lines[-1]:
+            self.compact()
+
+
+    def compact(self):
+        temp_file = f"{self.manifest_file}.tmp"
+        with open(temp_file, 'w') as file:
+            file.write(json.dumps({'matches_path': self.matches_path}) + '\n')
+            for file_name, entry in self.entries.items():
+                file.write(json.dumps({'file': file_name, **entry}) + '\n')
+        os.replace(temp_file, self.manifest_file)
+        self.unsaved = {}
+
+
+    def save(self):
+        if not self.unsaved:
+            return
+        with open(self.manifest_file, 'a') as file:
+            file.write(''.join(json.dumps({'file': file_name, **entry} if entry is not None else {'file': file_name, 'removed': True}) + '\n'
+                               for file_name, entry in self.unsaved.items()))
+        self.unsaved = {}
+
+
+    def file_stat(self, file_name):
+        stat = os.stat(os.path.join(self.matches_path, file_name))
+        return stat.st_mtime_ns, stat.st_size
+
+
+    def is_current(self, file_name):
+        entry = self.entries.get(file_name)
+        if entry is None:
+            return False
+        try:
+            return (entry['mtime'], entry['size']) == self.file_stat(entry.get('archive') or file_name)
+        except FileNotFoundError:
+            return False
+
+
+    def remove(self, file_name):
+        entry = self.entries.pop(file_name, None)
+        if entry is None:
+            return
+        self.unsaved[file_name] = None
+        if self.file_by_id.get(str(entry['MatchID'])) == file_name:
+            del self.file_by_id[str(entry['MatchID'])]
+        if entry['started']:
+            del self.order[bisect_left(self.order, (entry['started'], file_name))]
+
+
+    def update(self, file_name):
+        self.remove(file_name)
+        archive = self.archives.archive_of(file_name) if self.archives is not None else None
+        try:
+            if archive is not None:
+                mtime, size = self.file_stat(archive.file_name)
+                match_data = archive.match_data(file_name)
+            else:
+                mtime, size = self.file_stat(file_name)
+                with open(os.path.join(self.matches_path, file_name), 'r') as file:
+                    match_data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError): # missing or still being written, picked up on the next refresh
+            return None
+        entry = {'MatchID': match_data.get('MatchID'), 'eventsLogFile': match_data.get('eventsLogFile'),
+                 'gameStarted': match_data.get('gameStarted'), 'result': match_data.get('result'),
+                 'started': self.parse_started(match_data.get('gameStarted')), 'mtime': mtime, 'size': size,
+                 'archive': archive.file_name if archive is not None else None}
+        self.entries[file_name] = entry
+        self.unsaved[file_name] = entry
+        self.file_by_id[str(entry['MatchID'])] = file_name
+        if entry['started']:
+            insort(self.order, (entry['started'], file_name))
+        return entry
+
+
+    def parse_started(self, game_started):
+        try:
+            return datetime.strptime(game_started, "%m/%d/%Y %H:%M:%S").isoformat()
+        except (TypeError, ValueError):
+            return None
+
+
+    def refresh(self, new_only=False):
+        # new_only reads the files missing from the index without checking the ones it has
+        file_names = os.listdir(self.matches_path)
+        files = {file for file in file_names if "match.json" in file.lower()}
+        if self.archives is not None:
+            self.archives.refresh(file_names)
+            files.update(self.archives.match_files())
+        for file_name in list(self.entries):
+            if file_name not in files:
+                self.remove(file_name)
+        for file_name in files:
+            if new_only and file_name in self.entries:
+                continue
+            if not self.is_current(file_name):
+                self.update(file_name)
+        self.save()
+
+
+    def find(self, match_id):
+        file_name = self.file_by_id.get(str(match_id))
+        if file_name is not None and self.is_current(file_name):
+            return file_name
+        if file_name is not None:
+            self.update(file_name)
+        self.refresh(new_only=True)
+        return self.file_by_id.get(str(match_id))
+
+
+    def sorted_files(self):
+        self.refresh()
+        return [file_name for _, file_name in self.order]
+
+
+    def get(self, file_name):
+        if not self.is_current(file_name):
+            self.update(file_name)
+            self.save()
+        return self.entries.get(file_name)
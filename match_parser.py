@@ -0,0 +1,84 @@
+import os
+import logging
+from player_in_match import PlayerInMatch
+from players_list import PlayersList
+from match_class import Match
+from match_decoder import EventLogDecoder, read_match_file, decode_time
+from event_engine import EventEngine
+from match_stats import MatchStats
+from season_archive import SeasonArchives
+
+class MatchParser:
+    # builds a Match from its json files without touching the leaderboard, so it can run in worker processes
+    def __init__(self, matches_path, aliases=None, archives=None):
+        self.logger = logging.getLogger('FileHandler')
+        self.matches_path = matches_path
+        self.aliases = aliases
+        self.archives = archives if archives is not None else SeasonArchives(matches_path)
+
+
+    def read_match_data(self, json_file):
+        # archived matches are read from their season archive, everything else from the json file
+        archive = self.archives.archive_of(json_file)
+        if archive is not None:
+            return archive.match_data(json_file)
+        return read_match_file(os.path.join(self.matches_path, json_file))
+
+
+    def read_match(self, json_file):
+        match_data = self.read_match_data(json_file)
+        decoder = EventLogDecoder(self.aliases, decode_time(match_data['gameStarted']))
+        archive = self.archives.archive_of(json_file)
+        if archive is not None:
+            events = decoder.iter_records(archive.match_events(json_file), archive.string)
+        else:
+            events = decoder.iter_file(os.path.join(self.matches_path, match_data['eventsLogFile']))
+        return match_data, decoder, events
+
+
+    def players_from_match_data(self, match_data) -> PlayersList:
+        players_array = [x.strip() for x in match_data['players'].split(',')]
+        impostors_array = match_data['impostors'].split(", ")
+        if self.aliases is not None:
+            started = decode_time(match_data['gameStarted'])
+            players_array = [self.aliases.resolve(name, started) for name in players_array]
+            impostors_array = [self.aliases.resolve(name, started) for name in impostors_array]
+        players_list = PlayersList()
+        for player_name in players_array:
+            team = "impostor" if player_name in impostors_array else "crewmate"
+            players_list.add_player(PlayerInMatch(name=player_name, team=team))
+        return players_list
+
+
+    def match_from_events(self, match_data, decoder, events, players_list):
+        self.logger.debug(f"Filling Match {match_data['MatchID']} object from the events file")
+        match = Match(id=match_data['MatchID'], match_start_time=match_data['gameStarted'],
+                      result=match_data['result'], players=players_list, event_file_name=match_data['eventsLogFile'])
+        stats = MatchStats(match, decode_time(match_data['gameStarted']))
+        engine = EventEngine(match.players, decoder)
+        engine.subscribe(stats)
+        engine.run(events)
+        stats.finish()
+        return match
+
+
+    def parse(self, json_file) -> Match:
+        try:
+            match_data, decoder, events = self.read_match(json_file)
+        except Exception as e:
+            self.logger.error(str(e)+"Error reading match from file"+str(json_file))
+            return None
+        players_list = self.players_from_match_data(match_data)
+        match = self.match_from_events(match_data, decoder, events, players_list)
+        match.match_file_name = json_file
+        return match
+
+
+parsers = {} # one parser per matches folder in each worker process, so archives are mapped once per process
+
+def parse_match_file(matches_path, aliases, json_file):
+    parser = parsers.get(matches_path)
+    if parser is None:
+        parser = parsers[matches_path] = MatchParser(matches_path)
+    parser.aliases = aliases
+    return parser.parse(json_file)
@@ -0,0 +1,125 @@
+from match_class import Match
+from match_decoder import EventType, format_time
+
+class MatchStats:
+    def __init__(self, match : Match, started):
+        # the per-event rules behind the performance stats that MMR gains are calculated from
+        self.match = match
+        self.engine = None
+        self.death_happened = False
+        self.meeting_called_after_death = False
+        self.match_end_time = started
+        self.players_alive = 10
+        self.imps_alive = 2
+
+
+    def register(self, engine):
+        self.engine = engine
+        engine.on(EventType.TASK, self.task)
+        engine.on(EventType.PLAYER_VOTE, self.player_vote)
+        engine.on(EventType.DEATH, self.death)
+        engine.on(EventType.BODY_REPORT, self.body_report)
+        engine.on(EventType.MEETING_START, self.meeting_start)
+        engine.on(EventType.EXILED, self.exiled)
+        engine.on(EventType.MEETING_END, self.meeting_end)
+
+
+    def task(self, event, who):
+        who.name.finished_task()
+
+
+    def player_vote(self, event, who):
+        if self.death_happened:
+            self.meeting_called_after_death = True
+
+        target_name = self.engine.decoder.name(event.target)
+        if self.match.players.is_player_impostor(target_name):
+            who.player.correct_vote()
+
+        elif target_name !='none':
+            who.player.incorrect_vote()
+
+        who.player.last_voted = target_name
+
+        if self.match_end_time < event.time:
+            self.match_end_time = event.time
+
+
+    def death(self, event, who):
+        self.players_alive -= 1 # one player killed
+        self.death_happened = True
+        dead_player = who.name
+        dead_player.alive = False
+        dead_player.time_of_death = event.time
+        if self.meeting_called_after_death:
+            dead_player.died_first_round = False
+        else:
+            dead_player.died_first_round = True
+        killer = who.killer
+
+        if killer and killer.solo_imp: killer.kills_as_solo_imp += 1
+
+
+    def body_report(self, event, who):
+        self.meeting_called_after_death = True
+
+
+    def meeting_start(self, event, who):
+        if self.death_happened:
+            self.meeting_called_after_death = True
+
+
+    def exiled(self, event, who):
+        players = self.match.players
+        ejected_player_name = self.engine.decoder.name(event.player)
+        who.player.alive = False
+        who.player.time_of_death = event.time
+        ejected_imp = players.is_player_impostor(ejected_player_name)
+        if ejected_imp:
+            impostors = players.get_players_by_team("impostor")
+            for imp in impostors:
+                if imp.name != ejected_player_name and self.players_alive >= 7:
+                    imp.solo_imp = True
+            self.imps_alive -= 1
+
+            for player in players.players:
+                if self.players_alive >= 7:
+                    player.ejected_early_as_imp = True
+                if player.last_voted == ejected_player_name: #crewmate voted an imp out
+                    player.correct_vote_on_eject +=1
+
+        else: # voted a crewmate 
+            for player in players.players:
+                if player.last_voted == ejected_player_name: # voted a crewmate out
+                    if player.team == "impostor":
+                        player.got_crew_voted +=1
+                    if player.team == "crewmate":
+                        if ((self.players_alive in [3,4]) or ((self.players_alive in [5,6,7]) and (self.imps_alive == 2))) and player.alive:
+                            player.voted_wrong_on_crit = True
+                else: #didn't vote the crewmate who got voted
+                    if player.team == "crewmate":
+                        if ((self.players_alive in [3,4]) or ((self.players_alive in [5,6,7]) and (self.imps_alive == 2))) and player.alive:
+                            player.right_vote_on_crit_but_loss = True
+        self.players_alive -= 1 # one player ejected
+
+
+    def meeting_end(self, event, who):
+        players = self.match.players
+        # the alive check has always read the last player in the list (a loop variable left over from the exile loops)
+        if (event.result == "Skipped") and ((self.players_alive in [5,6]) and (self.imps_alive == 2)) and players.players[-1].alive:
+            for player in players.players:
+                if player.team == "crewmate":
+                    if player.last_voted == "none":
+                        player.voted_wrong_on_crit = True
+                    else: 
+                        voted_imp = players.is_player_impostor(player.last_voted)
+                        if not voted_imp:
+                            player.voted_wrong_on_crit = True
+
+
+    def finish(self):
+        for player in self.match.players.players:
+            if player.time_of_death is None:
+                player.time_of_death = self.match_end_time
+            player.time_of_death = format_time(player.time_of_death)
+        self.match.match_end_time = format_time(self.match_end_time)
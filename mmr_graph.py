@@ -0,0 +1,51 @@
+import io
+import threading
+from collections import OrderedDict
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+class MMRGraphRenderer:
+    def __init__(self, cache_size=256):
+        # figures are built with the object oriented api, so renders in different threads don't share any pyplot state
+        self.cache = OrderedDict() # key -> png bytes, least recently used first
+        self.cache_size = cache_size
+        self.lock = threading.Lock()
+
+
+    def get(self, key):
+        with self.lock:
+            png = self.cache.get(key)
+            if png is not None:
+                self.cache.move_to_end(key)
+            return png
+
+
+    def put(self, key, png):
+        with self.lock:
+            self.cache[key] = png
+            self.cache.move_to_end(key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return png
+
+
+    def clear(self):
+        with self.lock:
+            self.cache.clear()
+
+
+    def render(self, series, player_name):
+        # series: column -> (game numbers, values), as returned by Leaderboard.get_mmr_series
+        figure = Figure()
+        FigureCanvasAgg(figure)
+        axes = figure.add_subplot()
+        axes.plot(*series['imp'], color='red', label='Impostor MMR')
+        axes.plot(*series['crew'], color='blue', label='Crew MMR')
+        axes.plot(*series['mmr'], color='purple', label='Total MMR')
+        axes.set_xlabel(player_name)
+        axes.set_ylabel('MMR')
+        axes.set_title('MMR Changes Over Time')
+        axes.legend()
+        buf = io.BytesIO()
+        figure.savefig(buf, format='png')
+        return buf.getvalue()
@@ -0,0 +1,150 @@
+import os
+import threading
+import numpy as np
+
+# one fixed-width record per processed game: change in MMR, Crewmate MMR and Impostor MMR
+HISTORY_RECORD = np.dtype([('mmr', '<f8'), ('crew', '<f8'), ('imp', '<f8')])
+
+class MMRHistory:
+    def __init__(self, directory):
+        self.directory = directory
+        self.pending = {} # records appended since the last write_pending(), the leaderboard flush writes them with the rows that count them
+        self.lock = threading.RLock() # graphs read on other threads, they see the records either pending or in the file
+        os.makedirs(self.directory, exist_ok=True)
+
+
+    def history_file(self, player_id):
+        return os.path.join(self.directory, f"{int(player_id)}.bin")
+
+
+    def append(self, player_id, mmr_change, crew_change, imp_change):
+        with self.lock:
+            self.pending.setdefault(int(player_id), []).append((mmr_change, crew_change, imp_change))
+
+
+    def extend(self, player_id, mmr_changes, crew_changes, imp_changes):
+        with self.lock:
+            self.pending.setdefault(int(player_id), []).extend(zip(mmr_changes, crew_changes, imp_changes))
+
+
+    def write_pending(self):
+        with self.lock:
+            for player_id, records in self.pending.items():
+                with open(self.history_file(player_id), 'ab') as file:
+                    file.write(np.array(records, dtype=HISTORY_RECORD).tobytes())
+            self.pending = {}
+
+
+    def written_length(self, player_id):
+        try:
+            return os.path.getsize(self.history_file(player_id)) // HISTORY_RECORD.itemsize
+        except FileNotFoundError:
+            return 0
+
+
+    def length(self, player_id):
+        with self.lock:
+            return self.written_length(player_id) + len(self.pending.get(int(player_id), []))
+
+
+    def read(self, player_id):
+        # a copy rather than a memmap, the writer thread can truncate the file while a graph is rendered from it
+        with self.lock:
+            try:
+                with open(self.history_file(player_id), 'rb') as file:
+                    data = file.read()
+            except FileNotFoundError:
+                data = b''
+            pending = list(self.pending.get(int(player_id), ()))
+        written = np.frombuffer(data, dtype=HISTORY_RECORD, count=len(data) // HISTORY_RECORD.itemsize)
+        if not pending:
+            return written
+        return np.concatenate([written, np.array(pending, dtype=HISTORY_RECORD)])
+
+
+    def is_empty(self):
+        return not self.pending and not any(file_name.endswith('.bin') for file_name in os.listdir(self.directory))
+
+
+    def clear(self):
+        with self.lock:
+            self.pending = {}
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith('.bin'):
+                    os.remove(os.path.join(self.directory, file_name))
+
+
+    def truncate(self, lengths):
+        # back to the record counts of a checkpoint, players missing from it lose their whole file
+        with self.lock:
+            self.write_pending()
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith('.bin'):
+                    length = lengths.get(int(file_name[:-4]), 0)
+                    if length == 0:
+                        os.remove(os.path.join(self.directory, file_name))
+                    else:
+                        os.truncate(os.path.join(self.directory, file_name), length * HISTORY_RECORD.itemsize)
+
+
+    def recover(self, lengths):
+        # drops records past the counts saved with the leaderboard rows, left by a crash between write_pending and the save
+        with self.lock:
+            for file_name in os.listdir(self.directory):
+                if file_name.endswith('.bin'):
+                    path = os.path.join(self.directory, file_name)
+                    size = lengths.get(int(file_name[:-4]), 0) * HISTORY_RECORD.itemsize
+                    if size == 0:
+                        os.remove(path)
+                    elif os.path.getsize(path) > size:
+                        os.truncate(path, size)
+
+
+class MemoryMMRHistory:
+    # same interface as MMRHistory with the records kept in lists, written out once with write_to/append_to
+    def __init__(self, base_lengths=None):
+        self.records = {}
+        self.base_lengths = base_lengths or {} # records already on disk when replaying from a checkpoint
+
+
+    def append(self, player_id, mmr_change, crew_change, imp_change):
+        self.records.setdefault(int(player_id), []).append((mmr_change, crew_change, imp_change))
+
+
+    def extend(self, player_id, mmr_changes, crew_changes, imp_changes):
+        self.records.setdefault(int(player_id), []).extend(zip(mmr_changes, crew_changes, imp_changes))
+
+
+    def length(self, player_id):
+        return self.base_lengths.get(int(player_id), 0) + len(self.records.get(int(player_id), []))
+
+
+    def read(self, player_id):
+        return np.array(self.records.get(int(player_id), []), dtype=HISTORY_RECORD)
+
+
+    def is_empty(self):
+        return not self.records and not any(self.base_lengths.values())
+
+
+    def write_pending(self):
+        pass
+
+
+    def recover(self, lengths):
+        pass # nothing is written until write_to/append_to
+
+
+    def clear(self):
+        self.records = {}
+
+
+    def write_to(self, history):
+        history.clear()
+        self.append_to(history)
+
+
+    def append_to(self, history):
+        for player_id, records in self.records.items():
+            mmr_changes, crew_changes, imp_changes = zip(*records)
+            history.extend(player_id, mmr_changes, crew_changes, imp_changes)
@@ -0,0 +1,49 @@
+import numpy as np
+
+SERIES_COLUMNS = ('mmr', 'crew', 'imp')
+
+def cumulative_mmr(history, start=1000):
+    # running MMR, crewmate MMR and impostor MMR, point n is the value after the player's nth game
+    return {column: np.cumsum(np.concatenate(([start], history[column]))) for column in SERIES_COLUMNS}
+
+
+def lttb(x, y, points):
+    # Largest-Triangle-Three-Buckets: indices of `points` samples that keep the shape of y over x,
+    # the first and last point are always kept. One pass, one numpy step per bucket.
+    length = len(y)
+    if points >= length:
+        return np.arange(length)
+    if points <= 2:
+        return np.array([0, length - 1])[:max(points, 0)]
+    edges = np.linspace(1, length - 1, points - 1).astype(np.int64) # points - 2 buckets between the end points
+    selected = np.empty(points, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = length - 1
+    previous = 0
+    for bucket in range(points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_start, next_end = edges[bucket + 1], edges[bucket + 2]
+        else:
+            next_start, next_end = length - 1, length
+        next_x = x[next_start:next_end].mean()
+        next_y = y[next_start:next_end].mean()
+        areas = np.abs((x[previous] - next_x) * (y[start:end] - y[previous]) - (x[previous] - x[start:end]) * (next_y - y[previous]))
+        previous = start + int(areas.argmax())
+        selected[bucket + 1] = previous
+    return selected
+
+
+def mmr_series(history, points=None, first_game=None, last_game=None, start=1000):
+    # column -> (game numbers, values) of the games first_game..last_game (slice bounds, negative counts from the end),
+    # each column reduced to at most `points` points
+    games = np.arange(len(history) + 1)[first_game:last_game]
+    series = {}
+    for column, values in cumulative_mmr(history, start).items():
+        values = values[first_game:last_game]
+        if points is not None:
+            selected = lttb(games, values, points)
+            series[column] = (games[selected], values[selected])
+        else:
+            series[column] = (games, values)
+    return series
@@ -10,6 +10,8 @@ class PlayerInMatch:
                  won = True):
         
         self.name = name
+        self.id = None # position in the match's PlayersList
+        self.leaderboard_id = None # 'Player ID' of the leaderboard row, set when the match is rated
         self.discord = ""
         self.team = team 
         self.time_of_death = time_of_death
@@ -4,6 +4,9 @@ from rapidfuzz import fuzz
 class PlayersList:
     def __init__(self) :
         self.players = []
+        self.players_by_id = {} # match-local player id (order added) -> PlayerInMatch
+        self.ids_by_name = {} # exact name -> player id
+        self.resolved_ids = {} # any other event name -> player id or None, so the fuzzy fallback runs once per distinct name
         self.crewmate_mmr = 0
         self.impostor_mmr = 0
         self.impostor_win_rate = 0
@@ -16,7 +19,11 @@ class PlayersList:
 
 
     def add_player(self, player : PlayerInMatch):
+        player.id = len(self.players)
         self.players.append(player)
+        self.players_by_id[player.id] = player
+        self.ids_by_name.setdefault(player.name, player.id)
+        self.resolved_ids = {}
         if player.team == 'impostor':
             self.impostors_count += 1
         elif player.team == 'crewmate':
@@ -24,18 +31,32 @@ class PlayersList:
 
 
     def get_player_by_name(self, name)->PlayerInMatch:
-        for player in self.players:
-            if player.name == name:
-                return player 
+        return self.players_by_id.get(self.get_player_id(name))
+
+
+    def get_player_by_id(self, player_id)->PlayerInMatch:
+        return self.players_by_id.get(player_id)
+
+
+    def get_player_id(self, name):
+        player_id = self.ids_by_name.get(name)
+        if player_id is not None:
+            return player_id
+        if name not in self.resolved_ids:
+            self.resolved_ids[name] = self.find_player_id(name)
+        return self.resolved_ids[name]
+
+
+    def find_player_id(self, name):
         for player in self.players:
             if fuzz.ratio(player.name, name)>=70:
-                return player
+                return player.id
             
 
     def is_player_impostor(self, name) -> bool:
-        for player in self.players:
-            if player.name == name:
-                return player.team == "impostor" 
+        player_id = self.ids_by_name.get(name)
+        if player_id is not None:
+            return self.players_by_id[player_id].team == "impostor" 
             
 
     def get_players_by_team(self, team):
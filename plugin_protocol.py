@@ -0,0 +1,104 @@
+import json
+import zlib
+import select
+import socket
+import struct
+import asyncio
+
+# every message from the Impostor plugin is one frame: a flags byte, the payload length as a big endian
+# uint32 and the json payload, zlib compressed when FLAG_ZLIB is set. A connection carries any number of frames.
+FRAME_HEADER = struct.Struct('>BI')
+FLAG_ZLIB = 1
+MAX_FRAME_SIZE = 16 * 1024 * 1024
+COMPRESS_ABOVE = 1024 # smaller payloads are sent as plain json, compressing them saves nothing
+
+def encode_message(message, compress=False):
+    payload = json.dumps(message, separators=(',', ':')).encode('utf-8')
+    flags = 0
+    if compress and len(payload) > COMPRESS_ABOVE:
+        payload = zlib.compress(payload)
+        flags |= FLAG_ZLIB
+    return FRAME_HEADER.pack(flags, len(payload)) + payload
+
+
+def decode_payload(flags, payload):
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    return json.loads(payload.decode('utf-8'))
+
+
+async def read_frames(reader):
+    # yields (flags, payload) for each frame of a connection until the client closes it
+    first = await reader.read(1)
+    if not first:
+        return
+    if first == b'{': # plugin builds from before framing send one bare json object and close the connection
+        yield 0, first + await reader.read()
+        return
+    header = first + await reader.readexactly(FRAME_HEADER.size - 1)
+    while True:
+        flags, length = FRAME_HEADER.unpack(header)
+        if length > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame of {length} bytes is over the {MAX_FRAME_SIZE} byte limit")
+        yield flags, await reader.readexactly(length)
+        try:
+            header = await reader.readexactly(FRAME_HEADER.size)
+        except asyncio.IncompleteReadError as e:
+            if e.partial:
+                raise
+            return
+
+
+class PluginClient:
+    # the plugin's side of the protocol, one connection kept open, reopened when the bot closed it or a send fails
+    def __init__(self, host='localhost', port=5000, compress=True, timeout=5):
+        self.host = host
+        self.port = port
+        self.compress = compress
+        self.timeout = timeout
+        self.connection = None
+
+
+    def connect(self):
+        if self.connection is None:
+            self.connection = socket.create_connection((self.host, self.port), timeout=self.timeout)
+            self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        return self.connection
+
+
+    def peer_closed(self):
+        # the bot never writes back, so a readable socket with nothing to read is a connection it closed.
+        # A write to it still succeeds locally, the frame would just be lost
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK) == b''
+        except OSError:
+            return True
+
+
+    def send(self, message):
+        frame = encode_message(message, self.compress)
+        if self.connection is not None and self.peer_closed():
+            self.close()
+        try:
+            self.connect().sendall(frame)
+        except OSError:
+            self.close()
+            self.connect().sendall(frame)
+
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+    def __enter__(self):
+        self.connect()
+        return self
+
+
+    def __exit__(self, *exc_info):
+        self.close()
@@ -0,0 +1,103 @@
+import os
+import io
+import csv
+
+class ProcessedMatchesJournal:
+    def __init__(self, journal_file, sync_every=20, compact_every=5000):
+        # processed_matches.csv as an append-only journal, one match file name per line after the header
+        self.journal_file = journal_file
+        self.sync_every = sync_every # fsync once per this many appends, sync() forces it
+        self.compact_every = compact_every # rewritten sorted once per this many appends, and at load when torn
+        self.appended = 0
+        self.header = 'Match File Name'
+        self.matches = set()
+        self.pending = [] # added but not written yet, commit() once the leaderboard counting them is saved
+        self.unsynced = 0
+        self.file = None
+        self.load()
+
+
+    def __contains__(self, match_file_name):
+        return match_file_name in self.matches
+
+
+    def __len__(self):
+        return len(self.matches)
+
+
+    def load(self):
+        try:
+            with open(self.journal_file, 'r', newline='') as file:
+                text = file.read()
+        except FileNotFoundError:
+            text = ''
+        torn = text != '' and not text.endswith('\n') # an append cut off by a crash
+        lines = text.split('\n')[:-1]
+        rows = [row for row in csv.reader(lines) if row][1:]
+        self.matches = {row[0] for row in rows}
+        if torn or text == '' or len(rows) != len(self.matches):
+            self.compact()
+        else:
+            self.file = open(self.journal_file, 'a', newline='')
+
+
+    def csv_line(self, value):
+        line = io.StringIO()
+        csv.writer(line, lineterminator='\n').writerow([value])
+        return line.getvalue()
+
+
+    def add(self, match_file_name):
+        if match_file_name in self.matches:
+            return
+        self.matches.add(match_file_name)
+        self.pending.append(match_file_name)
+
+
+    def commit(self):
+        if not self.pending:
+            return
+        self.file.write(''.join(self.csv_line(match_file_name) for match_file_name in self.pending))
+        self.file.flush()
+        self.unsynced += len(self.pending)
+        self.appended += len(self.pending)
+        self.pending = []
+        if self.appended >= self.compact_every:
+            self.compact()
+        elif self.unsynced >= self.sync_every:
+            self.sync()
+
+
+    def sync(self):
+        self.commit()
+        if self.unsynced:
+            os.fsync(self.file.fileno())
+            self.unsynced = 0
+
+
+    def compact(self):
+        # rewrite the journal without duplicate or torn lines
+        if self.file is not None:
+            self.file.close()
+        temp_file = f"{self.journal_file}.tmp"
+        with open(temp_file, 'w', newline='') as file:
+            file.write(self.csv_line(self.header))
+            for match_file_name in sorted(self.matches):
+                file.write(self.csv_line(match_file_name))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_file, self.journal_file)
+        self.file = open(self.journal_file, 'a', newline='')
+        self.pending = []
+        self.unsynced = 0
+        self.appended = 0
+
+
+    def replace(self, match_file_names):
+        self.matches = set(match_file_names)
+        self.compact()
+
+
+    def close(self):
+        self.sync()
+        self.file.close()
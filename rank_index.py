@@ -0,0 +1,63 @@
+from bisect import bisect_left, insort
+
+class RankIndex:
+    def __init__(self):
+        # sorted (-mmr, player_id) keys, so position in the list is the 0-based rank
+        self.keys = []
+        self.key_of = {}
+
+
+    def __len__(self):
+        return len(self.keys)
+
+
+    def rebuild(self, mmr_by_player_id):
+        self.key_of = {player_id: (-float(mmr), player_id) for player_id, mmr in mmr_by_player_id}
+        self.keys = sorted(self.key_of.values())
+
+
+    def add(self, player_id, mmr):
+        key = (-float(mmr), player_id)
+        self.key_of[player_id] = key
+        insort(self.keys, key)
+
+
+    def remove(self, player_id):
+        key = self.key_of.pop(player_id, None)
+        if key is not None:
+            del self.keys[bisect_left(self.keys, key)]
+
+
+    def update(self, player_id, mmr):
+        # the new key goes in before the old one comes out, a reader on another thread never finds the player unranked
+        old_key = self.key_of.get(player_id)
+        key = (-float(mmr), player_id)
+        if old_key == key:
+            return
+        insort(self.keys, key)
+        self.key_of[player_id] = key
+        if old_key is not None:
+            del self.keys[bisect_left(self.keys, old_key)]
+
+
+    def rank(self, player_id):
+        key = self.key_of.get(player_id)
+        if key is None:
+            return None
+        return bisect_left(self.keys, key)
+
+
+    def top(self, count=10):
+        return [player_id for _, player_id in self.keys[:count]]
+
+
+    def around(self, player_id, span=2):
+        rank = self.rank(player_id)
+        if rank is None:
+            return []
+        start = max(rank - span, 0)
+        return [player_id for _, player_id in self.keys[start:rank + span + 1]]
+
+
+    def ids(self):
+        return [player_id for _, player_id in self.keys]
@@ -0,0 +1,160 @@
+import time
+import logging
+import numpy as np
+import pandas as pd
+from leaderboard import Leaderboard, MATCH_COLUMNS, apply_match_deltas, normalize_name
+from storage import MemoryStorage
+from mmr_history import MemoryMMRHistory
+
+FLOAT_COLUMNS = ['MMR', 'Crewmate MMR', 'Impostor MMR', 'Voting Accuracy (Crewmate games)']
+
+class ReplayLeaderboard(Leaderboard):
+    # the match columns are kept in numpy arrays while matches are replayed, flush() writes them to the DataFrame
+    # in one go (checkpoints and the end of the replay), the arithmetic is the same apply_match_deltas as live
+    def __init__(self, database_location, storage, history):
+        super().__init__(database_location, storage=storage, history=history)
+        self.load_arrays()
+
+
+    def load_arrays(self):
+        self.player_ids = list(self.leaderboard.index)
+        self.positions = {player_id: position for position, player_id in enumerate(self.player_ids)}
+        self.player_names = list(self.leaderboard['Player Name'])
+        self.player_discords = [int(discord_id) for discord_id in self.leaderboard['Player Discord']]
+        capacity = max(2 * len(self.player_ids), 64)
+        self.values = {}
+        for column in MATCH_COLUMNS:
+            self.values[column] = np.zeros(capacity, dtype=np.float64 if column in FLOAT_COLUMNS else np.int64)
+            self.values[column][:len(self.player_ids)] = self.leaderboard[column].to_numpy()
+        self.arrays_changed = False
+
+
+    def new_player(self, player_name):
+        position = len(self.player_ids)
+        if position == len(self.values['MMR']):
+            self.values = {column: np.concatenate([values, np.zeros_like(values)]) for column, values in self.values.items()}
+        player_id = self.next_player_id
+        self.next_player_id += 1
+        self.player_ids.append(player_id)
+        self.positions[player_id] = position
+        self.player_names.append(player_name)
+        self.player_discords.append(0)
+        for column in FLOAT_COLUMNS[:3]:
+            self.values[column][position] = 1000.0
+        self.values['Voting Accuracy (Crewmate games)'][position] = 1.0
+        self.name_index.setdefault(normalize_name(player_name), player_id)
+        self.arrays_changed = True
+        self.dirty = True
+
+
+    def get_player_info(self, player_name):
+        player_id = self.name_index[normalize_name(player_name)]
+        position = self.positions[player_id]
+        return (player_id, float(self.values['MMR'][position]), float(self.values['Crewmate MMR'][position]),
+                float(self.values['Impostor MMR'][position]), self.player_discords[position] or None)
+
+
+    def apply_match(self, match):
+        players = match.players.players
+        player_ids = [player.leaderboard_id for player in players]
+        if None in player_ids or len(set(player_ids)) != len(player_ids):
+            # the one player at a time path of the live leaderboard, run on the DataFrame
+            self.write_arrays()
+            super().apply_match(match)
+            self.load_arrays()
+            return
+        positions = [self.positions[player_id] for player_id in player_ids]
+        values = {column: self.values[column][positions] for column in MATCH_COLUMNS}
+        history_changes = apply_match_deltas(values, players)
+        for column in MATCH_COLUMNS:
+            self.values[column][positions] = values[column]
+        for player_id, (mmr_change, crew_change, imp_change) in zip(player_ids, history_changes):
+            self.history.append(player_id, mmr_change, crew_change, imp_change)
+        self.arrays_changed = True
+        self.dirty = True
+
+
+    def write_arrays(self):
+        if not self.arrays_changed:
+            return
+        count = len(self.player_ids)
+        leaderboard = pd.DataFrame({'Player Name': self.player_names, 'Player Discord': self.player_discords,
+                                    **{column: self.values[column][:count].copy() for column in MATCH_COLUMNS}},
+                                   index=pd.Index(self.player_ids, name='Player ID'))
+        for column in self.leaderboard.columns.difference(leaderboard.columns, sort=False):
+            leaderboard[column] = self.leaderboard[column]
+        self.arrays_changed = False
+        self.build_indexes(leaderboard[[*self.leaderboard.columns, *leaderboard.columns.difference(self.leaderboard.columns, sort=False)]])
+
+
+    def flush(self):
+        self.write_arrays()
+        self.changed_ids = None # the frame was rebuilt, every row counts its history again
+        super().flush()
+
+
+class SeasonReplay:
+    def __init__(self, file_handler):
+        # rebuilds the leaderboard from the match files through the same code as live processing,
+        # either the whole season or from the last checkpoint before a changed match
+        self.logger = logging.getLogger('FileHandler')
+        self.file_handler = file_handler
+
+
+    def restore(self, checkpoint, live_leaderboard):
+        # players keep their current names and discords, the tail of the season is replayed under them
+        leaderboard = checkpoint['leaderboard'].copy()
+        common = leaderboard.index.intersection(live_leaderboard.leaderboard.index)
+        leaderboard.loc[common, ['Player Name', 'Player Discord']] = live_leaderboard.leaderboard.loc[common, ['Player Name', 'Player Discord']]
+        return leaderboard
+
+
+    def run(self, since=None):
+        file_handler = self.file_handler
+        files = file_handler.get_sorted_files_with_match()
+        live_leaderboard = file_handler.leaderboard
+        checkpoint = None
+        if since is not None:
+            since_key = file_handler.match_key(since)
+            file_handler.checkpoints.discard_from(since_key)
+            sorted_keys = [file_handler.match_key(file) for file in files]
+            checkpoint = file_handler.checkpoints.latest_before(since_key)
+            while checkpoint is not None and not file_handler.checkpoints.is_complete(checkpoint, sorted_keys):
+                file_handler.checkpoints.discard_from(checkpoint['key'])
+                checkpoint = file_handler.checkpoints.latest_before(since_key)
+        if checkpoint is None:
+            replayed = ReplayLeaderboard(file_handler.database_location, storage=MemoryStorage(), history=MemoryMMRHistory())
+            history_lengths = None
+        else: # the snapshot holds every match up to its key
+            files = [file for file in files if file_handler.match_key(file) > checkpoint['key']]
+            replayed = ReplayLeaderboard(file_handler.database_location, storage=MemoryStorage(self.restore(checkpoint, live_leaderboard)),
+                                         history=MemoryMMRHistory(checkpoint['history_lengths']))
+            history_lengths = checkpoint['history_lengths']
+        offsets = live_leaderboard.manual_offsets(checkpoint)
+        started = time.monotonic()
+        processed_matches = set()
+
+        file_handler.checkpoints.defer(checkpoint)
+        file_handler.leaderboard = replayed
+        try:
+            match = file_handler.apply_matches(files, processed_matches)
+        except:
+            file_handler.checkpoints.cancel()
+            raise
+        finally:
+            file_handler.leaderboard = live_leaderboard
+        replayed.flush()
+        replayed.apply_offsets(offsets)
+
+        # the only writes of the replay
+        live_leaderboard.replace_with(replayed, history_lengths)
+        if since is None:
+            file_handler.checkpoints.clear()
+            file_handler.processed_matches.replace(processed_matches)
+        else:
+            for file in processed_matches:
+                file_handler.processed_matches.add(file)
+            file_handler.processed_matches.sync()
+        file_handler.checkpoints.commit()
+        self.logger.info(f"Replayed {len(files)} matches in {time.monotonic() - started:.1f}s")
+        return match
@@ -0,0 +1,175 @@
+import os
+import json
+import struct
+import numpy as np
+from match_decoder import EVENT_TYPES, EventType, NO_NAME, NO_TIME, iter_json_array, decode_time
+
+# a finished season packed into one file: a match table and an event table of fixed-width records,
+# every string (names, file names, results, timestamps) stored once in a string table and referenced by id
+ARCHIVE_EXTENSION = ".season"
+ARCHIVE_MAGIC = b"AUSEASON"
+ARCHIVE_VERSION = 1
+PREAMBLE = struct.Struct('<8sII') # magic, version, header length
+MATCH_RECORD = np.dtype([('match_id', '<i8'), ('match_file', '<i4'), ('events_file', '<i4'), ('game_started', '<i4'),
+                         ('result', '<i4'), ('players', '<i4'), ('impostors', '<i4'), ('started', '<i8'),
+                         ('first_event', '<i8'), ('event_count', '<i4')])
+EVENT_RECORD = np.dtype([('type', 'u1'), ('time', '<i8'), ('name', '<i4'), ('player', '<i4'), ('target', '<i4'),
+                         ('killer', '<i4'), ('dead_player', '<i4'), ('result', '<i4')])
+EVENT_NAME_KEYS = ['Name', 'Player', 'Target', 'Killer', 'DeadPlayer']
+
+class StringTable:
+    def __init__(self):
+        self.ids = {}
+        self.strings = []
+
+
+    def add(self, text):
+        if text is None:
+            return NO_NAME
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.ids[text] = string_id
+            self.strings.append(text)
+        return string_id
+
+
+    def arrays(self):
+        encoded = [text.encode('utf-8') for text in self.strings]
+        offsets = np.zeros(len(encoded) + 1, dtype='<i8')
+        offsets[1:] = np.cumsum([len(data) for data in encoded])
+        return offsets, np.frombuffer(b''.join(encoded), dtype=np.uint8)
+
+
+def write_archive(archive_path, matches_path, match_files):
+    # match files are packed in gameStarted order, so a replay reads the archive front to back
+    strings = StringTable()
+    match_data_by_file = {}
+    for match_file in match_files:
+        with open(os.path.join(matches_path, match_file), 'r') as file:
+            match_data_by_file[match_file] = json.load(file)
+    def started(match_file):
+        game_started = decode_time(match_data_by_file[match_file].get('gameStarted'))
+        return NO_TIME if game_started is None else game_started
+
+    matches = []
+    events = []
+    for match_file in sorted(match_data_by_file, key=lambda match_file: (started(match_file), match_file)):
+        match_data = match_data_by_file[match_file]
+        with open(os.path.join(matches_path, match_data['eventsLogFile']), 'r') as file:
+            text = file.read()
+        first_event = len(events)
+        for event in iter_json_array(text):
+            event_time = decode_time(event.get('Time'))
+            events.append((EVENT_TYPES.get(event.get('Event'), EventType.UNKNOWN), NO_TIME if event_time is None else event_time,
+                           *[strings.add(event.get(key)) for key in EVENT_NAME_KEYS], strings.add(event.get('Result'))))
+        matches.append((match_data['MatchID'], strings.add(match_file), strings.add(match_data['eventsLogFile']),
+                        strings.add(match_data.get('gameStarted')), strings.add(match_data.get('result')),
+                        strings.add(match_data.get('players')), strings.add(match_data.get('impostors')),
+                        started(match_file), first_event, len(events) - first_event))
+
+    offsets, data = strings.arrays()
+    tables = [('matches', np.array(matches, dtype=MATCH_RECORD)), ('events', np.array(events, dtype=EVENT_RECORD)),
+              ('string_offsets', offsets), ('string_data', data)]
+    header = {}
+    position = 0
+    for name, table in tables:
+        header[name] = [position, len(table)]
+        position += -(-table.nbytes // 8) * 8
+    header_bytes = json.dumps(header).encode('utf-8')
+    header_bytes += b' ' * (-(PREAMBLE.size + len(header_bytes)) % 8) # tables start 8 byte aligned
+    temp_file = f"{archive_path}.tmp"
+    with open(temp_file, 'wb') as file:
+        file.write(PREAMBLE.pack(ARCHIVE_MAGIC, ARCHIVE_VERSION, len(header_bytes)))
+        file.write(header_bytes)
+        for name, table in tables:
+            file.write(table.tobytes())
+            file.write(b'\0' * (-table.nbytes % 8))
+    os.replace(temp_file, archive_path)
+    return len(matches), len(events)
+
+
+class SeasonArchive:
+    def __init__(self, archive_path):
+        # tables are views into one read-only memory map, nothing is read until it's used
+        self.archive_path = archive_path
+        self.file_name = os.path.basename(archive_path)
+        with open(archive_path, 'rb') as file:
+            magic, version, header_length = PREAMBLE.unpack(file.read(PREAMBLE.size))
+            if magic != ARCHIVE_MAGIC or version != ARCHIVE_VERSION:
+                raise ValueError(f"{archive_path} is not a version {ARCHIVE_VERSION} season archive")
+            header = json.loads(file.read(header_length))
+        data = np.memmap(archive_path, dtype=np.uint8, mode='r')
+        start = PREAMBLE.size + header_length
+        def table(name, dtype):
+            offset, count = header[name]
+            return data[start + offset:start + offset + count * np.dtype(dtype).itemsize].view(dtype)
+        self.matches = table('matches', MATCH_RECORD)
+        self.events = table('events', EVENT_RECORD)
+        self.string_offsets = table('string_offsets', '<i8')
+        self.string_data = table('string_data', np.uint8)
+        self.strings = {}
+        self.row_by_file = {self.string(string_id): row for row, string_id in enumerate(self.matches['match_file'].tolist())}
+
+
+    def string(self, string_id):
+        if string_id == NO_NAME:
+            return None
+        text = self.strings.get(string_id)
+        if text is None:
+            text = self.string_data[self.string_offsets[string_id]:self.string_offsets[string_id + 1]].tobytes().decode('utf-8')
+            self.strings[string_id] = text
+        return text
+
+
+    def match_files(self):
+        return list(self.row_by_file)
+
+
+    def match_data(self, match_file):
+        # the fields of the archived *_match.json
+        match = self.matches[self.row_by_file[match_file]]
+        return {'MatchID': int(match['match_id']), 'gameStarted': self.string(match['game_started']),
+                'players': self.string(match['players']), 'impostors': self.string(match['impostors']),
+                'result': self.string(match['result']), 'eventsLogFile': self.string(match['events_file'])}
+
+
+    def match_events(self, match_file):
+        match = self.matches[self.row_by_file[match_file]]
+        return self.events[match['first_event']:match['first_event'] + match['event_count']]
+
+
+class SeasonArchives:
+    def __init__(self, matches_path):
+        # every archive in the matches folder, archived matches are found by their original match file name
+        self.matches_path = matches_path
+        self.archives = {}
+        self.archive_by_file = {}
+        self.stats = {}
+        self.refresh()
+
+
+    def refresh(self, file_names=None):
+        if file_names is None:
+            try:
+                file_names = os.listdir(self.matches_path)
+            except FileNotFoundError:
+                file_names = []
+        stats = {}
+        for file_name in file_names:
+            if file_name.endswith(ARCHIVE_EXTENSION):
+                stat = os.stat(os.path.join(self.matches_path, file_name))
+                stats[file_name] = (stat.st_mtime_ns, stat.st_size)
+        if stats == self.stats:
+            return
+        self.archives = {file_name: SeasonArchive(os.path.join(self.matches_path, file_name)) for file_name in sorted(stats)}
+        self.archive_by_file = {match_file: archive for archive in self.archives.values() for match_file in archive.match_files()}
+        self.stats = stats
+
+
+    def archive_of(self, match_file):
+        return self.archive_by_file.get(match_file)
+
+
+    def match_files(self):
+        return list(self.archive_by_file)
@@ -0,0 +1,129 @@
+import os
+import sqlite3
+import pandas as pd
+
+class LeaderboardStorage:
+    # storage engines load the leaderboard as a DataFrame indexed by 'Player ID' and persist it back
+    def load(self):
+        raise NotImplementedError
+
+
+    def save(self, leaderboard, ranked_ids, changed_ids=None):
+        # changed_ids=None means every row has to be written
+        raise NotImplementedError
+
+
+    def close(self):
+        pass
+
+
+class MemoryStorage(LeaderboardStorage):
+    # nothing is persisted, used while matches are replayed in memory, optionally starting from a checkpoint
+    def __init__(self, leaderboard=None):
+        self.leaderboard = leaderboard
+
+
+    def load(self):
+        return None if self.leaderboard is None else self.leaderboard.copy()
+
+
+    def save(self, leaderboard, ranked_ids, changed_ids=None):
+        pass
+
+
+class CSVStorage(LeaderboardStorage):
+    def __init__(self, csv_file):
+        self.csv_file = csv_file
+
+
+    def load(self):
+        try:
+            leaderboard = pd.read_csv(self.csv_file)
+        except FileNotFoundError:
+            return None
+        if 'Player ID' in leaderboard.columns:
+            leaderboard.drop(columns=['Rank'], inplace=True)
+        else: # saved before player ids existed, the old rank becomes the id
+            leaderboard.rename(columns={'Rank': 'Player ID'}, inplace=True)
+        leaderboard.set_index('Player ID', inplace=True)
+        return leaderboard
+
+
+    def save(self, leaderboard, ranked_ids, changed_ids=None):
+        temp_file = f"{self.csv_file}.tmp"
+        ordered = leaderboard.loc[ranked_ids].reset_index()
+        ordered.index.name = 'Rank'
+        ordered.to_csv(temp_file, float_format='%.3f')
+        os.replace(temp_file, self.csv_file)
+
+
+class SQLiteStorage(LeaderboardStorage):
+    def __init__(self, db_file, import_file=None):
+        self.db_file = db_file
+        self.import_file = import_file # CSV leaderboard loaded while the table doesn't exist yet, the first save copies it in
+        self.connection = sqlite3.connect(db_file, check_same_thread=False)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+
+
+    def table_exists(self):
+        row = self.connection.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='leaderboard'").fetchone()
+        return row is not None
+
+
+    def create_table(self, leaderboard):
+        columns = ['"Player ID" INTEGER PRIMARY KEY']
+        for column, dtype in leaderboard.dtypes.items():
+            columns.append(f'"{column}" {sql_type(dtype)}')
+        self.connection.execute(f"CREATE TABLE leaderboard ({', '.join(columns)})")
+        self.connection.execute("CREATE INDEX ix_leaderboard_name ON leaderboard (lower(replace(\"Player Name\", ' ', '')))")
+        self.connection.execute("CREATE INDEX ix_leaderboard_discord ON leaderboard (\"Player Discord\")")
+
+
+    def add_missing_columns(self, leaderboard):
+        existing = {row[1] for row in self.connection.execute("PRAGMA table_info(leaderboard)")}
+        for column, dtype in leaderboard.dtypes.items():
+            if column not in existing:
+                self.connection.execute(f'ALTER TABLE leaderboard ADD COLUMN "{column}" {sql_type(dtype)}')
+
+
+    def load(self):
+        if not self.table_exists():
+            return None if self.import_file is None else CSVStorage(self.import_file).load()
+        return pd.read_sql_query("SELECT * FROM leaderboard", self.connection, index_col='Player ID')
+
+
+    def save(self, leaderboard, ranked_ids, changed_ids=None):
+        if not self.table_exists(): # a new table needs every row, not only the changed ones
+            changed_ids = None
+        rows = leaderboard if changed_ids is None else leaderboard.loc[sorted(changed_ids)]
+        rows = rows.reset_index().astype(object) # sqlite3 can't bind numpy scalars
+        columns = ', '.join(f'"{column}"' for column in rows.columns)
+        placeholders = ', '.join('?' for _ in rows.columns)
+        with self.connection: # one transaction, every changed row or none of them
+            if not self.table_exists():
+                self.create_table(leaderboard)
+            else:
+                self.add_missing_columns(leaderboard)
+                if changed_ids is None: # a full save replaces the table, players dropped from the leaderboard go with it
+                    self.connection.execute("DELETE FROM leaderboard")
+            self.connection.executemany(f"INSERT OR REPLACE INTO leaderboard ({columns}) VALUES ({placeholders})",
+                                        rows.values.tolist())
+
+
+    def close(self):
+        self.connection.close()
+
+
+def sql_type(dtype):
+    if pd.api.types.is_float_dtype(dtype):
+        return 'REAL'
+    elif pd.api.types.is_integer_dtype(dtype):
+        return 'INTEGER'
+    return 'TEXT'
+
+
+def storage_for(database_location):
+    if os.path.splitext(database_location)[1].lower() in ['.db', '.sqlite', '.sqlite3']:
+        return SQLiteStorage(database_location, f"{os.path.splitext(database_location)[0]}.csv")
+    return CSVStorage(database_location)
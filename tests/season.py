@@ -0,0 +1,64 @@
+import os
+import json
+import random
+from datetime import datetime, timedelta
+
+# a generated season: match files started 20 minutes apart with their event logs, the same for a seed
+PLAYERS = [f"Player {number}" for number in range(24)]
+TIME_FORMAT = "%m/%d/%Y %H:%M:%S"
+SEASON_START = datetime(2024, 5, 1, 12, 0, 0)
+
+
+def match_events(rng, players, impostors, start):
+    events = []
+    time = start
+
+    def tick():
+        nonlocal time
+        time += timedelta(seconds=rng.randint(5, 40))
+        return time.strftime(TIME_FORMAT)
+
+    for player in players:
+        if player not in impostors:
+            for _ in range(rng.randint(0, 6)):
+                events.append({'Event': "Task", 'Name': player, 'Time': tick()})
+    alive = list(players)
+    for _ in range(5):
+        crewmates = [player for player in alive if player not in impostors]
+        victim = rng.choice(crewmates)
+        events.append({'Event': "Death", 'Name': victim, 'Killer': rng.choice([player for player in alive if player in impostors]), 'Time': tick()})
+        alive.remove(victim)
+        events.append({'Event': "BodyReport", 'Player': rng.choice(alive), 'DeadPlayer': victim, 'Time': tick()})
+        for player in alive:
+            events.append({'Event': "PlayerVote", 'Player': player, 'Target': rng.choice(alive + ["none"]), 'Time': tick()})
+        exiled = rng.choice(alive)
+        events.append({'Event': "Exiled", 'Player': exiled, 'Time': tick()})
+        events.append({'Event': "MeetingEnd", 'Result': "Exiled", 'Time': tick()})
+        alive.remove(exiled)
+        impostors_alive = [player for player in alive if player in impostors]
+        if not impostors_alive:
+            return events, "Crewmates Win"
+        if len(impostors_alive) >= len(alive) - len(impostors_alive):
+            return events, "Impostors Win"
+    return events, rng.choice(["Crewmates Win", "Impostors Win", "HumansByVote"])
+
+
+def write_season(directory, count, seed=1, first=0):
+    # matches first..count-1, a season can be written in parts by calling it again with first
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    for match_id in range(count):
+        players = rng.sample(PLAYERS, 10)
+        impostors = players[:2]
+        rng.shuffle(players)
+        start = SEASON_START + timedelta(minutes=20 * match_id)
+        events, result = match_events(rng, players, impostors, start)
+        if match_id < first:
+            continue
+        events_file = f"{match_id}_events.json"
+        with open(os.path.join(directory, events_file), 'w') as file:
+            json.dump(events, file)
+        match = {'MatchID': match_id, 'gameStarted': start.strftime(TIME_FORMAT), 'players': ", ".join(players),
+                 'impostors': ", ".join(impostors), 'result': result, 'eventsLogFile': events_file}
+        with open(os.path.join(directory, f"{match_id}_match.json"), 'w') as file:
+            json.dump(match, file)
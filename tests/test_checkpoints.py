@@ -0,0 +1,36 @@
+import os
+from season import write_season
+from file_processing import FileHandler
+
+
+def test_checkpoints_continue_after_restart(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    season = str(tmp_path / "season")
+    write_season(season, 150)
+    file_handler = FileHandler(season, "lb.csv", checkpoint_interval=50)
+    file_handler.process_unprocessed_matches()
+    file_handler.close()
+
+    write_season(season, 300, first=150)
+    file_handler = FileHandler(season, "lb.csv", checkpoint_interval=50)
+    assert file_handler.checkpoints.match_count == 150
+    file_handler.process_unprocessed_matches()
+    file_handler.close()
+    assert [key[1] for key in file_handler.checkpoints.keys] == [f"{match_id}_match.json" for match_id in range(49, 300, 50)]
+
+
+def test_late_match_drops_later_checkpoints(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    season = str(tmp_path / "season")
+    write_season(season, 100)
+    os.rename(os.path.join(season, "30_match.json"), str(tmp_path / "30_match.json"))
+    file_handler = FileHandler(season, "lb.csv", checkpoint_interval=20)
+    file_handler.process_unprocessed_matches()
+    assert [key[1] for key in file_handler.checkpoints.keys] == ["19_match.json", "40_match.json", "60_match.json", "80_match.json"]
+
+    # started before the last three checkpoints, they don't hold it and are dropped, the count goes on
+    os.rename(str(tmp_path / "30_match.json"), os.path.join(season, "30_match.json"))
+    file_handler.process_unprocessed_matches()
+    file_handler.close()
+    assert file_handler.checkpoints.match_count == 100
+    assert [key[1] for key in file_handler.checkpoints.keys] == ["19_match.json", "99_match.json"]
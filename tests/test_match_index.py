@@ -0,0 +1,44 @@
+import os
+from season import write_season
+from match_index import MatchIndex
+
+
+def manifest_lines(manifest_file):
+    with open(manifest_file, 'r') as file:
+        return file.read().split('\n')[:-1]
+
+
+def test_manifest_appends_and_compacts(tmp_path):
+    season = str(tmp_path / "season")
+    manifest_file = str(tmp_path / "match_index.jsonl")
+    write_season(season, 20)
+    match_index = MatchIndex(season, manifest_file)
+    assert len(match_index.sorted_files()) == 20
+    assert len(manifest_lines(manifest_file)) == 21
+
+    write_season(season, 21, first=20)
+    os.remove(os.path.join(season, "3_match.json"))
+    assert match_index.get("20_match.json")['MatchID'] == 20
+    assert len(match_index.sorted_files()) == 20
+    assert len(manifest_lines(manifest_file)) == 23 # one line for the new match, one for the removed one
+
+    with open(manifest_file, 'a') as file:
+        file.write('{"file": "cut off by a cra')
+    reloaded = MatchIndex(season, manifest_file)
+    assert reloaded.entries == match_index.entries
+    assert len(manifest_lines(manifest_file)) == 21
+
+
+def test_find_miss_reads_only_new_files(tmp_path, monkeypatch):
+    season = str(tmp_path / "season")
+    write_season(season, 20)
+    match_index = MatchIndex(season, str(tmp_path / "match_index.jsonl"))
+    match_index.sorted_files()
+    write_season(season, 21, first=20)
+
+    stat_calls = []
+    file_stat = MatchIndex.file_stat
+    monkeypatch.setattr(MatchIndex, 'file_stat', lambda self, file_name: stat_calls.append(file_name) or file_stat(self, file_name))
+    assert match_index.find(999) is None
+    assert match_index.find(20) == "20_match.json"
+    assert stat_calls == ["20_match.json", "20_match.json"]
@@ -0,0 +1,137 @@
+import json
+import asyncio
+import pytest
+from plugin_protocol import (FRAME_HEADER, FLAG_ZLIB, MAX_FRAME_SIZE, COMPRESS_ABOVE, PluginClient,
+                             encode_message, decode_payload, read_frames)
+
+
+def game_end_message(players=15):
+    return {'EventName': "GameEnd", 'MatchID': 42, 'GameCode': "ABCDEF",
+            'Players': [f"Player {number}" for number in range(players)],
+            'PlayerColors': ["Red"] * players, 'DeadPlayers': [], 'Impostors': ["Player 0", "Player 1"],
+            'Crewmates': [f"Player {number}" for number in range(2, players)], 'Result': "CrewmatesWin",
+            'Events': [{'Event': "Task", 'Name': f"Player {number}", 'Time': 1700000000000 + number} for number in range(2, players)]}
+
+
+def frames_of(data):
+    async def read():
+        reader = asyncio.StreamReader()
+        reader.feed_data(data)
+        reader.feed_eof()
+        return [frame async for frame in read_frames(reader)]
+    return asyncio.run(read())
+
+
+def test_small_message_is_not_compressed():
+    message = {'EventName': "MeetingStart", 'MatchID': 42}
+    frame = encode_message(message, compress=True)
+    flags, length = FRAME_HEADER.unpack_from(frame)
+    assert flags == 0
+    assert length == len(frame) - FRAME_HEADER.size
+    assert decode_payload(flags, frame[FRAME_HEADER.size:]) == message
+
+
+def test_large_message_is_compressed():
+    message = game_end_message()
+    assert len(json.dumps(message)) > COMPRESS_ABOVE
+    frame = encode_message(message, compress=True)
+    flags, length = FRAME_HEADER.unpack_from(frame)
+    assert flags & FLAG_ZLIB
+    assert length < len(encode_message(message)) - FRAME_HEADER.size
+    assert decode_payload(flags, frame[FRAME_HEADER.size:]) == message
+
+
+def test_read_frames_splits_a_stream():
+    messages = [{'EventName': "GameStart", 'MatchID': 1}, game_end_message(), {'EventName': "GameStart", 'MatchID': 2}]
+    data = b''.join(encode_message(message, compress=True) for message in messages)
+    assert [decode_payload(flags, payload) for flags, payload in frames_of(data)] == messages
+
+
+def test_read_frames_legacy_json():
+    message = {'EventName': "GameStart", 'MatchID': 1}
+    assert [decode_payload(flags, payload) for flags, payload in frames_of(json.dumps(message).encode('utf-8'))] == [message]
+
+
+def test_read_frames_rejects_oversized_frame():
+    with pytest.raises(ValueError):
+        frames_of(FRAME_HEADER.pack(0, MAX_FRAME_SIZE + 1))
+
+
+def test_read_frames_truncated_frame():
+    frame = encode_message(game_end_message())
+    with pytest.raises(asyncio.IncompleteReadError):
+        frames_of(frame[:-1])
+
+
+def test_plugin_client_round_trip():
+    messages = [{'EventName': "GameStart", 'MatchID': 1}, game_end_message(), {'EventName': "MeetingEnd", 'MatchID': 1}]
+
+    async def exchange():
+        received = []
+        connections = []
+
+        async def handle_client(reader, writer):
+            connections.append(writer)
+            async for flags, payload in read_frames(reader):
+                received.append((flags, decode_payload(flags, payload)))
+            writer.close()
+
+        server = await asyncio.start_server(handle_client, 'localhost', 0)
+        port = server.sockets[0].getsockname()[1]
+
+        def send():
+            with PluginClient(port=port) as client:
+                for message in messages:
+                    client.send(message)
+
+        async with server:
+            await asyncio.to_thread(send)
+            for _ in range(100):
+                if len(received) == len(messages):
+                    break
+                await asyncio.sleep(0.01)
+        return received, connections
+
+    received, connections = asyncio.run(exchange())
+    assert [message for flags, message in received] == messages
+    assert [bool(flags & FLAG_ZLIB) for flags, message in received] == [False, True, False]
+    assert len(connections) == 1 # every message went over the same connection
+
+
+def test_plugin_client_reconnects_after_server_restart():
+    async def exchange():
+        received = []
+        writers = []
+
+        async def handle_client(reader, writer):
+            writers.append(writer)
+            async for flags, payload in read_frames(reader):
+                received.append(decode_payload(flags, payload))
+
+        async def wait_for(count):
+            for _ in range(100):
+                if len(received) == count:
+                    break
+                await asyncio.sleep(0.01)
+
+        server = await asyncio.start_server(handle_client, 'localhost', 0)
+        port = server.sockets[0].getsockname()[1]
+        client = PluginClient(port=port)
+        await asyncio.to_thread(client.send, {'n': 1})
+        await wait_for(1)
+
+        # the bot restarts, its end of the open connection is closed
+        server.close()
+        for writer in writers:
+            writer.close()
+        await server.wait_closed()
+        await asyncio.sleep(0.05)
+        server = await asyncio.start_server(handle_client, 'localhost', port)
+        async with server:
+            for n in range(2, 5):
+                await asyncio.to_thread(client.send, {'n': n})
+            await wait_for(4)
+            client.close()
+        return received
+
+    assert asyncio.run(exchange()) == [{'n': 1}, {'n': 2}, {'n': 3}, {'n': 4}]
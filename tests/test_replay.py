@@ -0,0 +1,46 @@
+import os
+import pytest
+from season import write_season
+from file_processing import FileHandler
+
+
+def saved_files(directory):
+    # the leaderboard and every MMR history file, as bytes
+    files = {"lb.csv": (directory / "lb.csv").read_bytes()}
+    for history_file in sorted((directory / "lb_history").iterdir()):
+        files[history_file.name] = history_file.read_bytes()
+    return files
+
+
+def run_in(directory, monkeypatch, action, season, **kwargs):
+    # processed_matches.csv and the match index are written to the working directory
+    directory.mkdir()
+    monkeypatch.chdir(directory)
+    file_handler = FileHandler(season, "lb.csv", **kwargs)
+    action(file_handler)
+    file_handler.close()
+    return file_handler
+
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_replay_matches_processing(tmp_path, monkeypatch, workers):
+    season = str(tmp_path / "season")
+    write_season(season, 120)
+    run_in(tmp_path / "processed", monkeypatch, FileHandler.process_unprocessed_matches, season)
+    run_in(tmp_path / "replayed", monkeypatch, FileHandler.replay_season, season, workers=workers)
+    assert saved_files(tmp_path / "replayed") == saved_files(tmp_path / "processed")
+
+
+def test_changed_result_from_checkpoint_matches_full_replay(tmp_path, monkeypatch):
+    season = str(tmp_path / "season")
+    write_season(season, 120)
+
+    def process_and_change(file_handler):
+        file_handler.process_unprocessed_matches()
+        assert file_handler.checkpoints.latest_before(file_handler.match_key("70_match.json"))['key'][1] == "59_match.json"
+        result = file_handler.match_index.get("70_match.json")['result']
+        file_handler.change_match_result(70, "Impostors Win" if result != "Impostors Win" else "Crewmates Win")
+
+    run_in(tmp_path / "changed", monkeypatch, process_and_change, season, checkpoint_interval=20)
+    run_in(tmp_path / "replayed", monkeypatch, FileHandler.replay_season, season)
+    assert saved_files(tmp_path / "changed") == saved_files(tmp_path / "replayed")
@@ -0,0 +1,133 @@
+import sqlite3
+import pandas as pd
+import pytest
+from storage import SQLiteStorage, CSVStorage, storage_for
+from leaderboard import Leaderboard
+from mmr_history import MMRHistory
+
+
+def make_leaderboard(player_ids):
+    leaderboard = pd.DataFrame({'Player ID': player_ids,
+                                'Player Name': [f"player{player_id}" for player_id in player_ids],
+                                'Player Discord': [10**18 + player_id for player_id in player_ids],
+                                'MMR': [1000.0 + player_id for player_id in player_ids],
+                                'Total Number Of Games Played': [player_id for player_id in player_ids]})
+    return leaderboard.set_index('Player ID')
+
+
+def stored_ids(db_file):
+    with sqlite3.connect(db_file) as connection:
+        return [row[0] for row in connection.execute('SELECT "Player ID" FROM leaderboard ORDER BY "Player ID"')]
+
+
+def test_load_without_table(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "lb.db"))
+    assert storage.load() is None
+    storage.close()
+
+
+def test_save_and_load(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "lb.db"))
+    leaderboard = make_leaderboard([0, 1, 2])
+    storage.save(leaderboard, list(leaderboard.index))
+    loaded = storage.load()
+    storage.close()
+    pd.testing.assert_frame_equal(loaded, leaderboard, check_dtype=False)
+    assert loaded.loc[2, 'Player Discord'] == 10**18 + 2
+
+
+def test_save_changed_ids_only(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "lb.db"))
+    leaderboard = make_leaderboard([0, 1, 2])
+    storage.save(leaderboard, list(leaderboard.index))
+    leaderboard.loc[0, 'MMR'] = 1.0
+    leaderboard.loc[1, 'MMR'] = 2.0
+    storage.save(leaderboard, list(leaderboard.index), {1})
+    loaded = storage.load()
+    storage.close()
+    assert loaded.loc[0, 'MMR'] == 1000.0
+    assert loaded.loc[1, 'MMR'] == 2.0
+
+
+def test_save_changed_ids_is_one_transaction(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "lb.db"))
+    leaderboard = make_leaderboard([0, 1, 2])
+    storage.save(leaderboard, list(leaderboard.index))
+    leaderboard['Player Name'] = leaderboard['Player Name'].astype(object)
+    leaderboard.loc[0, 'MMR'] = 1.0
+    leaderboard.at[2, 'Player Name'] = ['not', 'bindable']
+    with pytest.raises(sqlite3.Error):
+        storage.save(leaderboard, list(leaderboard.index), {0, 2})
+    loaded = storage.load()
+    storage.close()
+    assert loaded.loc[0, 'MMR'] == 1000.0
+
+
+def test_full_save_removes_rows(tmp_path):
+    db_file = str(tmp_path / "lb.db")
+    storage = SQLiteStorage(db_file)
+    leaderboard = make_leaderboard([0, 1, 2, 3])
+    storage.save(leaderboard, list(leaderboard.index))
+    storage.save(leaderboard.drop(index=[1, 3]), [0, 2])
+    storage.close()
+    assert stored_ids(db_file) == [0, 2]
+
+
+def test_missing_table_imports_csv(tmp_path):
+    leaderboard = make_leaderboard([0, 1, 2])
+    CSVStorage(str(tmp_path / "lb.csv")).save(leaderboard, [2, 1, 0])
+    storage = storage_for(str(tmp_path / "lb.db"))
+    loaded = storage.load()
+    assert sorted(loaded.index) == [0, 1, 2]
+    # the first save creates the table with every row, not only the changed ones
+    storage.save(leaderboard, [2, 1, 0], {1})
+    storage.close()
+    assert stored_ids(str(tmp_path / "lb.db")) == [0, 1, 2]
+
+
+def test_empty_store_keeps_history(tmp_path):
+    history = MMRHistory(str(tmp_path / "lb_history"))
+    history.append(0, 10.0, 10.0, 0.0)
+    history.write_pending()
+    with pytest.raises(RuntimeError):
+        Leaderboard(str(tmp_path / "lb.db"))
+    assert history.length(0) == 1
+
+
+def test_save_adds_new_columns(tmp_path):
+    storage = SQLiteStorage(str(tmp_path / "lb.db"))
+    leaderboard = make_leaderboard([0, 1])
+    storage.save(leaderboard, list(leaderboard.index))
+    leaderboard['MMR History Records'] = [3, 4]
+    storage.save(leaderboard, list(leaderboard.index), {1})
+    loaded = storage.load()
+    storage.close()
+    assert loaded.loc[1, 'MMR History Records'] == 4
+
+
+def test_history_cut_to_saved_rows(tmp_path, monkeypatch):
+    db_file = str(tmp_path / "lb.db")
+    leaderboard = Leaderboard(db_file)
+    leaderboard.new_player("a")
+    leaderboard.new_player("b")
+    leaderboard.history.append(0, 10.0, 10.0, 0.0)
+    leaderboard.mark_changed(0)
+    leaderboard.dirty = True
+    leaderboard.flush()
+    # the history is written, then the process dies before the rows are saved
+    def crash(*args, **kwargs):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(leaderboard.storage, 'save', crash)
+    leaderboard.history.append(0, 5.0, 5.0, 0.0)
+    leaderboard.history.append(1, 5.0, 0.0, 5.0)
+    leaderboard.mark_changed(0)
+    leaderboard.mark_changed(1)
+    leaderboard.dirty = True
+    with pytest.raises(KeyboardInterrupt):
+        leaderboard.flush()
+    assert leaderboard.history.written_length(0) == 2
+    leaderboard.storage.close()
+    reloaded = Leaderboard(db_file)
+    assert reloaded.history.length(0) == 1
+    assert reloaded.history.length(1) == 0
+    reloaded.storage.close()
@@ -0,0 +1,26 @@
+import asyncio
+import logging
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+
+class WorkExecutor:
+    def __init__(self, render_workers=1):
+        # blocking work leaves the event loop: every leaderboard mutation runs on one writer thread, in submission
+        # order, so they never interleave; rendering runs on its own pool so a graph never waits behind a replay
+        self.logger = logging.getLogger('Discord_Bot')
+        self.writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='leaderboard-writer')
+        self.renderer = ThreadPoolExecutor(max_workers=render_workers, thread_name_prefix='render')
+
+
+    async def write(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.writer, partial(function, *args, **kwargs))
+
+
+    async def render(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(self.renderer, partial(function, *args, **kwargs))
+
+
+    def shutdown(self):
+        # queued writes still run, the caller flushes after them
+        self.renderer.shutdown(wait=False, cancel_futures=True)
+        self.writer.shutdown(wait=True)